@@ -0,0 +1,274 @@
+"""
+Synthetic updates covering every branch of the update and message formatters.
+
+``corpus()`` returns ``(name, update)`` pairs, names are ``<event type>`` or ``message:<content type>``.
+"""
+
+from typing import Any
+
+from aiogram.types import Update
+
+DATE = 1_700_000_000
+
+
+def user(user_id: int = 1001, first_name: str = "Alice", last_name: str | None = "Smith") -> dict[str, Any]:
+    return {"id": user_id, "is_bot": False, "first_name": first_name, "last_name": last_name}
+
+
+def chat(chat_id: int = -1001, chat_type: str = "supergroup") -> dict[str, Any]:
+    if chat_type == "private":
+        return {"id": chat_id, "type": chat_type, "first_name": "Alice", "last_name": "Smith"}
+    return {"id": chat_id, "type": chat_type, "title": "Busy group"}
+
+
+def file(**fields: Any) -> dict[str, Any]:
+    return {"file_id": "AgACAgIAAxkBAAIB", "file_unique_id": "AQADAgATx", **fields}
+
+
+def photo() -> list[dict[str, Any]]:
+    return [file(width=90, height=90), file(width=1280, height=1280, file_size=123456)]
+
+
+def message(message_id: int = 42, **content: Any) -> dict[str, Any]:
+    return {"message_id": message_id, "date": DATE, "chat": chat(), "from": user(), **content}
+
+
+TEXT = "Hello <there>, this is a message\nwith a couple of lines and some markup-looking <b>tags</b>"
+
+MESSAGE_CONTENTS: dict[str, dict[str, Any]] = {
+    "text": {"text": TEXT},
+    "audio": {"audio": file(duration=180, title="Song", performer="Band <live>")},
+    "animation": {
+        "animation": file(width=320, height=240, duration=3),
+        "document": file(file_name="animation.gif.mp4"),
+    },
+    "document": {"document": file(file_name="report <final>.pdf", file_size=2048), "caption": "See attached"},
+    "game": {"game": {"title": "Game", "description": "A game", "photo": photo(), "text": "Play it"}},
+    "photo": {"photo": photo(), "caption": TEXT},
+    "sticker": {
+        "sticker": file(
+            type="regular", width=512, height=512, is_animated=False, is_video=False, emoji="😀", set_name="pack"
+        )
+    },
+    "story": {"story": {"chat": chat(-1002, "channel"), "id": 7}},
+    "video": {"video": file(width=1920, height=1080, duration=60, file_name="video.mp4", file_size=10_000_000)},
+    "video_note": {"video_note": file(length=240, duration=10)},
+    "voice": {"voice": file(duration=12)},
+    "contact": {
+        "contact": {"phone_number": "+10000000000", "first_name": "Bob", "last_name": "Jones", "user_id": 1002}
+    },
+    "dice": {"dice": {"emoji": "🎲", "value": 4}},
+    "poll": {
+        "poll": {
+            "id": "5001",
+            "question": "Lunch?",
+            "options": [{"text": "Yes", "voter_count": 0}, {"text": "No", "voter_count": 0}],
+            "total_voter_count": 0,
+            "is_closed": False,
+            "is_anonymous": True,
+            "type": "regular",
+            "allows_multiple_answers": False,
+        }
+    },
+    "venue": {"venue": {"location": {"latitude": 51.5, "longitude": -0.12}, "title": "Office", "address": "1 Main St"}},
+    "location": {"location": {"latitude": 51.5, "longitude": -0.12, "horizontal_accuracy": 10, "live_period": 900}},
+    "new_chat_members": {"new_chat_members": [user(1002, "Bob"), user(1003, "Carol")]},
+    "left_chat_member": {"left_chat_member": user(1002, "Bob")},
+    "new_chat_title": {"new_chat_title": "Even busier group"},
+    "new_chat_photo": {"new_chat_photo": photo()},
+    "delete_chat_photo": {"delete_chat_photo": True},
+    "group_chat_created": {"group_chat_created": True},
+    "supergroup_chat_created": {"supergroup_chat_created": True},
+    "channel_chat_created": {"channel_chat_created": True},
+    "message_auto_delete_timer_changed": {"message_auto_delete_timer_changed": {"message_auto_delete_time": 86400}},
+    "migrate_to_chat_id": {"migrate_to_chat_id": -1003},
+    "migrate_from_chat_id": {"migrate_from_chat_id": -1004},
+    "pinned_message": {"pinned_message": message(41, text="Pinned")},
+    "invoice": {
+        "invoice": {
+            "title": "Premium",
+            "description": "A month of premium",
+            "start_parameter": "premium",
+            "currency": "usd",
+            "total_amount": 499,
+        }
+    },
+    "successful_payment": {
+        "successful_payment": {
+            "currency": "usd",
+            "total_amount": 499,
+            "invoice_payload": "premium",
+            "telegram_payment_charge_id": "tg_1",
+            "provider_payment_charge_id": "pr_1",
+        }
+    },
+    "refunded_payment": {
+        "refunded_payment": {
+            "currency": "XTR",
+            "total_amount": 50,
+            "invoice_payload": "premium",
+            "telegram_payment_charge_id": "tg_1",
+        }
+    },
+    "users_shared": {"users_shared": {"request_id": 1, "users": [{"user_id": 1002, "first_name": "Bob"}]}},
+    "chat_shared": {"chat_shared": {"request_id": 2, "chat_id": -1005, "title": "Other group"}},
+    "chat_background_set": {
+        "chat_background_set": {
+            "type": {"type": "fill", "fill": {"type": "solid", "color": 0}, "dark_theme_dimming": 0}
+        }
+    },
+    "forum_topic_created": {"forum_topic_created": {"name": "Topic", "icon_color": 7322096}},
+    "forum_topic_closed": {"forum_topic_closed": {}},
+    "forum_topic_edited": {"forum_topic_edited": {"name": "Renamed topic"}},
+    "forum_topic_reopened": {"forum_topic_reopened": {}},
+    "general_forum_topic_hidden": {"general_forum_topic_hidden": {}},
+    "general_forum_topic_unhidden": {"general_forum_topic_unhidden": {}},
+    # not handled by any formatter
+    "giveaway": {"giveaway": {"chats": [chat()], "winners_selection_date": DATE + 86400, "winner_count": 3}},
+}
+
+UPDATES: dict[str, dict[str, Any]] = {
+    "edited_message": {"edited_message": message(text=TEXT, edit_date=DATE + 60)},
+    "channel_post": {"channel_post": {**message(text=TEXT, chat=chat(-1002, "channel")), "from": None}},
+    "edited_channel_post": {
+        "edited_channel_post": {**message(text=TEXT, chat=chat(-1002, "channel"), edit_date=DATE), "from": None}
+    },
+    "business_message": {"business_message": message(text=TEXT, business_connection_id="bc1")},
+    "edited_business_message": {
+        "edited_business_message": message(text=TEXT, business_connection_id="bc1", edit_date=DATE + 60)
+    },
+    "business_connection": {
+        "business_connection": {
+            "id": "bc1",
+            "user": user(),
+            "user_chat_id": 1001,
+            "date": DATE,
+            "can_reply": True,
+            "is_enabled": True,
+        }
+    },
+    "deleted_business_messages": {
+        "deleted_business_messages": {
+            "business_connection_id": "bc1",
+            "chat": chat(1001, "private"),
+            "message_ids": [1, 2],
+        }
+    },
+    "message_reaction": {
+        "message_reaction": {
+            "chat": chat(),
+            "message_id": 42,
+            "date": DATE,
+            "user": user(),
+            "old_reaction": [{"type": "emoji", "emoji": "👍"}],
+            "new_reaction": [{"type": "emoji", "emoji": "🔥"}, {"type": "custom_emoji", "custom_emoji_id": "5368"}],
+        }
+    },
+    "message_reaction_count": {
+        "message_reaction_count": {
+            "chat": chat(),
+            "message_id": 42,
+            "date": DATE,
+            "reactions": [
+                {"type": {"type": "emoji", "emoji": "👍"}, "total_count": 120},
+                {"type": {"type": "paid"}, "total_count": 3},
+            ],
+        }
+    },
+    "inline_query": {
+        "inline_query": {
+            "id": "iq1",
+            "from": user(),
+            "query": "cats <3",
+            "offset": "20",
+            "chat_type": "sender",
+            "location": {"latitude": 51.5, "longitude": -0.12},
+        }
+    },
+    "chosen_inline_result": {
+        "chosen_inline_result": {"result_id": "r1", "from": user(), "query": "cats", "inline_message_id": "im1"}
+    },
+    "callback_query": {
+        "callback_query": {
+            "id": "cq1",
+            "from": user(),
+            "chat_instance": "ci1",
+            "data": "page:2",
+            "message": message(text="Pick a page"),
+        }
+    },
+    "shipping_query": {
+        "shipping_query": {
+            "id": "sq1",
+            "from": user(),
+            "invoice_payload": "premium",
+            "shipping_address": {
+                "country_code": "gb",
+                "state": "",
+                "city": "London",
+                "street_line1": "1 Main St",
+                "street_line2": "",
+                "post_code": "N1",
+            },
+        }
+    },
+    "pre_checkout_query": {
+        "pre_checkout_query": {
+            "id": "pq1",
+            "from": user(),
+            "currency": "usd",
+            "total_amount": 499,
+            "invoice_payload": "premium",
+        }
+    },
+    "purchased_paid_media": {"purchased_paid_media": {"from": user(), "paid_media_payload": "media1"}},
+    "poll": {"poll": MESSAGE_CONTENTS["poll"]["poll"]},
+    "poll_answer": {"poll_answer": {"poll_id": "5001", "option_ids": [0], "user": user()}},
+    "my_chat_member": {
+        "my_chat_member": {
+            "chat": chat(),
+            "from": user(),
+            "date": DATE,
+            "old_chat_member": {"status": "member", "user": user(1002, "Bob")},
+            "new_chat_member": {"status": "kicked", "user": user(1002, "Bob"), "until_date": 0},
+        }
+    },
+    "chat_member": {
+        "chat_member": {
+            "chat": chat(),
+            "from": user(1002, "Bob"),
+            "date": DATE,
+            "old_chat_member": {"status": "member", "user": user(1002, "Bob")},
+            "new_chat_member": {"status": "left", "user": user(1002, "Bob")},
+        }
+    },
+    "chat_join_request": {"chat_join_request": {"chat": chat(), "from": user(), "user_chat_id": 1001, "date": DATE}},
+    "chat_boost": {
+        "chat_boost": {
+            "chat": chat(),
+            "boost": {
+                "boost_id": "b1",
+                "add_date": DATE,
+                "expiration_date": DATE + 86400,
+                "source": {"source": "premium", "user": user()},
+            },
+        }
+    },
+    "removed_chat_boost": {
+        "removed_chat_boost": {
+            "chat": chat(),
+            "boost_id": "b1",
+            "remove_date": DATE,
+            "source": {"source": "premium", "user": user()},
+        }
+    },
+}
+
+
+def corpus() -> list[tuple[str, Update]]:
+    updates = [
+        (f"message:{content_type}", {"message": message(**content)})
+        for content_type, content in MESSAGE_CONTENTS.items()
+    ]
+    updates += list(UPDATES.items())
+    return [(name, Update.model_validate({"update_id": i, **update})) for i, (name, update) in enumerate(updates, 1)]
@@ -0,0 +1,76 @@
+"""
+Decoding of getUpdates responses: the stock session against the fast decode session (``FAST_DECODE=true``).
+
+For each session it reports the time to decode and validate a whole batch, per update,
+and the time until the first update of the batch can be dispatched.
+The batch is built from the synthetic corpus, or from a recording made with ``RECORD_UPDATES``.
+
+Run from the project root: ``python -m benchmarks.decoding [--batch 100] [--corpus updates.jsonl.gz]``
+"""
+
+import argparse
+import time
+from typing import Any, Callable
+
+import orjson
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import GetUpdates
+
+from benchmarks.corpus import corpus
+from src.services.decoding import FastDecodeSession
+from src.services.recorder import read_recording
+
+
+def load_updates(path: str | None) -> list[dict[str, Any]]:
+    if path is None:
+        return [update.model_dump(mode="json", by_alias=True, exclude_none=True) for _, update in corpus()]
+
+    return [update for _, update in read_recording(path)]
+
+
+def best_of(func: Callable[[], Any], number: int, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=100, help="updates per getUpdates response")
+    parser.add_argument("--corpus", help="recording of updates instead of the synthetic corpus")
+    parser.add_argument("-n", "--number", type=int, default=20, help="iterations per measurement")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="measurements, the best one is kept")
+    args = parser.parse_args()
+
+    updates = load_updates(args.corpus)
+    batch = [{**updates[i % len(updates)], "update_id": i} for i in range(args.batch)]
+    content = orjson.dumps({"ok": True, "result": batch}).decode()
+
+    bot = Bot("42:TEST")
+    method = GetUpdates()
+
+    print(f"{len(batch)} updates per response, {len(content) / 1024:.1f} KiB")
+    print(f"{'session':<12} {'per update':>12} {'whole batch':>12} {'first update':>13}")
+    for name, session in (("stock", AiohttpSession()), ("fast decode", FastDecodeSession())):
+
+        def whole() -> None:
+            for _ in session.check_response(bot, method, 200, content).result or []:
+                pass
+
+        def first() -> None:
+            next(iter(session.check_response(bot, method, 200, content).result or []))
+
+        whole_time = best_of(whole, args.number, args.repeat)
+        first_time = best_of(first, args.number, args.repeat)
+        print(
+            f"{name:<12} {whole_time / len(batch) * 1e6:>9.2f} µs {whole_time * 1e3:>9.2f} ms {first_time * 1e3:>10.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
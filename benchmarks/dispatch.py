@@ -0,0 +1,154 @@
+"""
+Micro-benchmark of the formatter dispatch: the sequential ``match`` blocks the formatters used to have
+against the registry lookup they use now.
+
+Run from the project root: ``python -m benchmarks.dispatch``
+"""
+
+import random
+import timeit
+from typing import Callable, cast
+
+from aiogram.enums import ContentType
+
+from src.services.formatters.logs import content_formatters
+from src.services.formatters.updates import update_formatters
+
+# order of the arms in the former ``match`` blocks
+LEGACY_CONTENT_TYPES = [
+    ContentType.TEXT,
+    ContentType.AUDIO,
+    ContentType.ANIMATION,
+    ContentType.DOCUMENT,
+    ContentType.GAME,
+    ContentType.PHOTO,
+    ContentType.STICKER,
+    ContentType.STORY,
+    ContentType.VIDEO,
+    ContentType.VIDEO_NOTE,
+    ContentType.VOICE,
+    ContentType.CONTACT,
+    ContentType.DICE,
+    ContentType.POLL,
+    ContentType.VENUE,
+    ContentType.LOCATION,
+    ContentType.NEW_CHAT_MEMBERS,
+    ContentType.LEFT_CHAT_MEMBER,
+    ContentType.NEW_CHAT_TITLE,
+    ContentType.NEW_CHAT_PHOTO,
+    ContentType.DELETE_CHAT_PHOTO,
+    ContentType.GROUP_CHAT_CREATED,
+    ContentType.SUPERGROUP_CHAT_CREATED,
+    ContentType.CHANNEL_CHAT_CREATED,
+    ContentType.MESSAGE_AUTO_DELETE_TIMER_CHANGED,
+    ContentType.MIGRATE_TO_CHAT_ID,
+    ContentType.MIGRATE_FROM_CHAT_ID,
+    ContentType.PINNED_MESSAGE,
+    ContentType.INVOICE,
+    ContentType.SUCCESSFUL_PAYMENT,
+    ContentType.REFUNDED_PAYMENT,
+    ContentType.USERS_SHARED,
+    ContentType.CHAT_SHARED,
+    ContentType.CHAT_BACKGROUND_SET,
+    ContentType.FORUM_TOPIC_CREATED,
+    ContentType.FORUM_TOPIC_CLOSED,
+    ContentType.FORUM_TOPIC_EDITED,
+    ContentType.FORUM_TOPIC_REOPENED,
+    ContentType.GENERAL_FORUM_TOPIC_HIDDEN,
+    ContentType.GENERAL_FORUM_TOPIC_UNHIDDEN,
+]
+LEGACY_EVENT_TYPES = [
+    ("message", "business_message", "edited_message", "edited_business_message", "edited_channel_post", "channel_post"),
+    ("business_connection",),
+    ("deleted_business_messages",),
+    ("message_reaction",),
+    ("message_reaction_count",),
+    ("inline_query",),
+    ("chosen_inline_result",),
+    ("callback_query",),
+    ("shipping_query",),
+    ("pre_checkout_query",),
+    ("purchased_paid_media",),
+    ("poll",),
+    ("poll_answer",),
+    ("my_chat_member", "chat_member"),
+    ("chat_join_request",),
+    ("chat_boost",),
+    ("removed_chat_boost",),
+]
+
+CONTENT_TYPE_WEIGHTS = {
+    ContentType.TEXT: 50,
+    ContentType.PHOTO: 12,
+    ContentType.STICKER: 10,
+    ContentType.VIDEO: 5,
+    ContentType.VOICE: 5,
+    ContentType.DOCUMENT: 4,
+    ContentType.ANIMATION: 4,
+    ContentType.NEW_CHAT_MEMBERS: 2,
+    ContentType.LEFT_CHAT_MEMBER: 2,
+    ContentType.PINNED_MESSAGE: 1,
+    ContentType.FORUM_TOPIC_CREATED: 1,
+    ContentType.GENERAL_FORUM_TOPIC_UNHIDDEN: 1,
+    ContentType.GIVEAWAY: 1,
+    ContentType.UNKNOWN: 1,
+}
+EVENT_TYPE_WEIGHTS = {
+    "message": 40,
+    "edited_message": 10,
+    "callback_query": 15,
+    "message_reaction": 10,
+    "message_reaction_count": 10,
+    "chat_member": 5,
+    "poll": 3,
+    "inline_query": 3,
+    "chat_boost": 2,
+    "removed_chat_boost": 1,
+    "edited_business_message": 1,
+}
+
+
+def legacy_dispatch(name: str, arms: list[str]) -> Callable[[str], int]:
+    """Build a function with a ``match`` statement that has the given arms in the given order"""
+    source = f"def {name}(value):\n    match value:\n"
+    for i, arm in enumerate(arms):
+        source += f"        case {arm}:\n            return {i}\n"
+    source += "        case _:\n            return -1\n"
+
+    namespace: dict[str, object] = {"ContentType": ContentType}
+    exec(source, namespace)
+    return cast(Callable[[str], int], namespace[name])
+
+
+def bench(title: str, func: Callable[[str], object], corpus: list[str], repeat: int = 5) -> float:
+    best = min(timeit.repeat(lambda: [func(v) for v in corpus], number=1, repeat=repeat))
+    per_item = best / len(corpus) * 1e9
+    print(f"{title:<32} {per_item:8.1f} ns/item")
+    return per_item
+
+
+def main() -> None:
+    rng = random.Random(0)
+    content_corpus: list[str] = rng.choices(
+        list(CONTENT_TYPE_WEIGHTS), weights=list(CONTENT_TYPE_WEIGHTS.values()), k=200_000
+    )
+    event_corpus: list[str] = rng.choices(
+        list(EVENT_TYPE_WEIGHTS), weights=list(EVENT_TYPE_WEIGHTS.values()), k=200_000
+    )
+
+    legacy_content = legacy_dispatch("content", [f"ContentType.{c.name}" for c in LEGACY_CONTENT_TYPES])
+    legacy_event = legacy_dispatch("event", [" | ".join(f'"{t}"' for t in arm) for arm in LEGACY_EVENT_TYPES])
+
+    print(f"content types ({len(content_corpus)} messages)")
+    old = bench("  match", legacy_content, content_corpus)
+    new = bench("  registry", content_formatters.get, content_corpus)
+    print(f"  speedup: {old / new:.2f}x")
+
+    print(f"event types ({len(event_corpus)} updates)")
+    old = bench("  match", legacy_event, event_corpus)
+    new = bench("  registry", update_formatters.get, event_corpus)
+    print(f"  speedup: {old / new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
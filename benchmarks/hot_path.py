@@ -0,0 +1,145 @@
+"""
+Cost of the update logging hot path for every update type of the synthetic corpus.
+
+For every case it reports the time of the formatter alone, the time of the whole ``logger_middleware``
+with a no-op handler (logs are formatted by loguru, but written to a null sink) and the peak memory allocated
+by one middleware call.
+
+Run from the project root: ``python -m benchmarks.hot_path [--mode json] [-k callback] [--save base.json]``
+and check a change against a saved run with ``--compare base.json``, which fails on regressions.
+"""
+
+import argparse
+import asyncio
+import io
+import sys
+import time
+import tracemalloc
+from typing import Any, TextIO, cast
+
+import orjson
+from aiogram.dispatcher.middlewares.user_context import (
+    EVENT_CONTEXT_KEY,
+    UserContextMiddleware,
+)
+from aiogram.types import Update
+
+from benchmarks.corpus import corpus
+from src.services.formatters.updates import update_log_message
+from src.services.logging import configure_logger
+from src.services.middlewares.logging import logger_middleware
+from src.types.settings import settings
+
+
+class NullStream(io.TextIOBase):
+    def write(self, s: str) -> int:
+        return len(s)
+
+
+async def noop(event: Update, data: dict[str, Any]) -> None:
+    return None
+
+
+def bench_formatter(update: Update, number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        update_log_message(update)
+    return (time.perf_counter() - start) / number * 1e9
+
+
+async def bench_middleware(update: Update, data: dict[str, Any], number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        await logger_middleware(noop, update, data)
+    return (time.perf_counter() - start) / number * 1e9
+
+
+async def allocated(update: Update, data: dict[str, Any]) -> int:
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        await logger_middleware(noop, update, data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - before
+
+
+async def run(args: argparse.Namespace) -> dict[str, dict[str, float]]:
+    results: dict[str, dict[str, float]] = {}
+    for name, update in corpus():
+        if args.k and args.k not in name:
+            continue
+
+        data = {EVENT_CONTEXT_KEY: UserContextMiddleware.resolve_event_context(update)}
+        await bench_middleware(update, data, 100)  # warm up the caches
+
+        results[name] = {
+            "formatter_ns": min(bench_formatter(update, args.number) for _ in range(args.repeat)),
+            "middleware_ns": min([await bench_middleware(update, data, args.number) for _ in range(args.repeat)]),
+            "allocated_bytes": await allocated(update, data),
+        }
+    return results
+
+
+def report(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]] | None) -> None:
+    print(f"{'update':<48} {'formatter':>12} {'middleware':>12} {'allocated':>12}")
+    for name, result in results.items():
+        line = (
+            f"{name:<48} {result['formatter_ns']:>9.0f} ns {result['middleware_ns']:>9.0f} ns "
+            f"{result['allocated_bytes']:>10.0f} B"
+        )
+        if baseline and name in baseline:
+            line += f"  {result['middleware_ns'] / baseline[name]['middleware_ns'] - 1:+7.1%}"
+        print(line)
+
+    total = sum(r["middleware_ns"] for r in results.values()) / max(len(results), 1)
+    print(f"{'mean':<48} {'':>12} {total:>9.0f} ns")
+
+
+def regressions(
+    results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]], tolerance: float
+) -> list[str]:
+    return [
+        name
+        for name, result in results.items()
+        if name in baseline and result["middleware_ns"] > baseline[name]["middleware_ns"] * (1 + tolerance)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("console", "json"), default="console", help="log output mode")
+    parser.add_argument("-k", help="only run updates whose name contains this string")
+    parser.add_argument("-n", "--number", type=int, default=2000, help="iterations per measurement")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="measurements per update, the best one is kept")
+    parser.add_argument("--save", help="save results as JSON to this path")
+    parser.add_argument("--compare", help="compare with results saved by --save")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown when comparing")
+    args = parser.parse_args()
+
+    settings.log_mode = args.mode
+    configure_logger(cast(TextIO, NullStream()))
+
+    results = asyncio.run(run(args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "rb") as f:
+            baseline = orjson.loads(f.read())
+    report(results, baseline)
+
+    if args.save:
+        with open(args.save, "wb") as f:
+            f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+
+    if baseline:
+        slower = regressions(results, baseline, args.tolerance)
+        if slower:
+            print(f"Regressions over {args.tolerance:.0%}: {', '.join(slower)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Overhead of the metrics middlewares per update, measured against a no-op handler.
+
+Run from the project root: ``python -m benchmarks.metrics``
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import Router
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import Update
+
+from src.services.middlewares.metrics import (
+    handler_metrics_middleware,
+    update_metrics_middleware,
+)
+
+ITERATIONS = 200_000
+
+
+async def noop(event: Any, data: dict[str, Any]) -> None:
+    return None
+
+
+async def measure(call: Callable[[], Awaitable[Any]]) -> float:
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await call()
+    return (time.perf_counter() - start) / ITERATIONS * 1e9
+
+
+async def run() -> None:
+    update = Update.model_validate(
+        {
+            "update_id": 1,
+            "poll": {
+                "id": "1",
+                "question": "?",
+                "options": [],
+                "total_voter_count": 0,
+                "is_closed": False,
+                "is_anonymous": True,
+                "type": "regular",
+                "allows_multiple_answers": False,
+            },
+        }
+    )
+    data: dict[str, Any] = {
+        "event_update": update,
+        "event_router": Router(name="bench"),
+        "handler": HandlerObject(callback=noop),
+    }
+
+    baseline = min([await measure(lambda: noop(update, data)) for _ in range(3)])
+    update_level = min([await measure(lambda: update_metrics_middleware(noop, update, data)) for _ in range(3)])
+    handler_level = min([await measure(lambda: handler_metrics_middleware(noop, update, data)) for _ in range(3)])
+
+    print(f"no-op handler              {baseline:8.1f} ns/update")
+    print(f"update metrics overhead    {update_level - baseline:8.1f} ns/update")
+    print(f"handler metrics overhead   {handler_level - baseline:8.1f} ns/update")
+
+
+def main() -> None:
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
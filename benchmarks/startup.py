@@ -0,0 +1,59 @@
+"""
+Import time report of the bot, based on ``python -X importtime``.
+
+Imports ``src.main`` in fresh interpreters a few times and reports the best cumulative time
+of the whole import, the heaviest third-party packages and every module of the project.
+
+Run from the project root: ``python -m benchmarks.startup [runs]``
+"""
+
+import os
+import re
+import subprocess
+import sys
+
+IMPORT_TIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def import_times() -> dict[str, tuple[int, int]]:
+    """Cumulative import time in microseconds and nesting depth of every module imported by ``src.main``"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.main"],
+        capture_output=True,
+        text=True,
+        env={"BOT_TOKEN": "1:startup", **os.environ},
+        check=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match:
+            times[match[4]] = (int(match[2]), len(match[3]) // 2)
+    return times
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    best: dict[str, tuple[int, int]] = {}
+    for _ in range(runs):
+        for module, (cumulative, depth) in import_times().items():
+            if module not in best or cumulative < best[module][0]:
+                best[module] = (cumulative, depth)
+
+    print(f"import src.main: {best['src.main'][0] / 1000:.1f} ms (best of {runs})")
+
+    print("\nheaviest packages:")
+    packages = {m: t for m, (t, depth) in best.items() if "." not in m and not m.startswith("src")}
+    for module, cumulative in sorted(packages.items(), key=lambda p: -p[1])[:10]:
+        print(f"  {cumulative / 1000:9.1f} ms  {module}")
+
+    print("\nproject modules:")
+    for module, (cumulative, depth) in sorted(best.items()):
+        if module.startswith("src"):
+            print(f"  {cumulative / 1000:9.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
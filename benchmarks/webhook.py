@@ -0,0 +1,177 @@
+"""
+Load generator comparing update throughput of long polling and the webhook server.
+
+Both modes run against a local stub of the Bot API, so no network access or real token is needed.
+Polling gets the synthetic updates from the stub ``getUpdates``, webhook gets them POSTed by concurrent clients
+running in a separate process.
+
+Run from the project root: ``python -m benchmarks.webhook [updates] [handler delay in ms] [getUpdates latency in ms]``
+
+The stub answers instantly by default, which favors polling as it gets 100 updates per round trip;
+set the ``getUpdates`` latency to the round trip time to the real Bot API for a fair comparison.
+"""
+
+import asyncio
+import multiprocessing
+import sys
+import time
+from typing import Any
+
+from aiogram import Bot as AiogramBot
+from aiogram import Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Message
+from aiohttp import ClientSession, web
+from loguru import logger
+
+from src.services.webhook import WebhookRequestHandler
+
+STUB_PORT = 8781
+WEBHOOK_PORT = 8782
+SECRET = "benchmark-secret"
+CLIENTS = 64
+
+
+def synthetic_update(update_id: int) -> dict[str, Any]:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": update_id % 500, "type": "private", "first_name": "User"},
+            "from": {"id": update_id % 500, "is_bot": False, "first_name": "User"},
+            "text": f"message {update_id}",
+        },
+    }
+
+
+class StubBotAPI:
+    """Just enough of the Bot API to run polling: getMe, getUpdates and ``True`` for everything else"""
+
+    def __init__(self, updates: int, latency: float = 0.0) -> None:
+        self.pending = [synthetic_update(i) for i in range(1, updates + 1)]
+        self.latency = latency
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        if method == "getme":
+            result: Any = {"id": 1, "is_bot": True, "first_name": "Stub", "username": "stub_bot"}
+        elif method == "getupdates":
+            form = await request.post()
+            await asyncio.sleep(self.latency)
+            offset = int(str(form.get("offset") or 0))
+            self.pending = [u for u in self.pending if u["update_id"] >= offset]
+            result = self.pending[:100]
+            if not result:
+                await asyncio.sleep(0.05)
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    async def start(self) -> web.AppRunner:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", STUB_PORT).start()
+        return runner
+
+
+def counting_dispatcher(total: int, delay: float) -> tuple[Dispatcher, asyncio.Event]:
+    dispatcher = Dispatcher()
+    done = asyncio.Event()
+    processed = 0
+
+    @dispatcher.message()
+    async def on_message(message: Message) -> None:
+        nonlocal processed
+        if delay:
+            await asyncio.sleep(delay)
+        processed += 1
+        if processed == total:
+            done.set()
+
+    return dispatcher, done
+
+
+def stub_bot() -> AiogramBot:
+    session = AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{STUB_PORT}"))
+    return AiogramBot(token="1:stub", session=session)
+
+
+async def bench_polling(total: int, delay: float, latency: float) -> float:
+    stub = await StubBotAPI(total, latency).start()
+    dispatcher, done = counting_dispatcher(total, delay)
+    bot = stub_bot()
+
+    start = time.perf_counter()
+    polling = asyncio.create_task(dispatcher.start_polling(bot, handle_signals=False, polling_timeout=1))
+    await done.wait()
+    elapsed = time.perf_counter() - start
+
+    await dispatcher.stop_polling()
+    await polling
+    await stub.cleanup()
+    return elapsed
+
+
+async def bench_webhook(total: int, delay: float, latency: float) -> float:
+    stub = await StubBotAPI(0).start()
+    dispatcher, done = counting_dispatcher(total, delay)
+    bot = stub_bot()
+
+    app = web.Application()
+    WebhookRequestHandler(dispatcher, bot, secret_token=SECRET).register(app, path="/webhook")
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", WEBHOOK_PORT).start()
+
+    start = time.perf_counter()
+    load = multiprocessing.Process(target=generate_load, args=(total,))
+    load.start()
+    await done.wait()
+    elapsed = time.perf_counter() - start
+
+    load.join()
+    await runner.cleanup()
+    await stub.cleanup()
+    return elapsed
+
+
+def generate_load(total: int) -> None:
+    """POST the updates from a separate process, so the clients don't compete with the server for the loop"""
+    updates = iter(range(1, total + 1))
+
+    async def client(session: ClientSession) -> None:
+        for update_id in updates:
+            async with session.post(
+                f"http://127.0.0.1:{WEBHOOK_PORT}/webhook",
+                json=synthetic_update(update_id),
+                headers={"X-Telegram-Bot-Api-Secret-Token": SECRET},
+            ) as response:
+                response.raise_for_status()
+
+    async def run_clients() -> None:
+        async with ClientSession() as session:
+            await asyncio.gather(*(client(session) for _ in range(CLIENTS)))
+
+    asyncio.run(run_clients())
+
+
+async def run(total: int, delay: float, latency: float) -> None:
+    for name, bench in (("polling", bench_polling), ("webhook", bench_webhook)):
+        elapsed = await bench(total, delay, latency)
+        print(f"{name:<8} {total} updates in {elapsed:6.2f}s - {total / elapsed:8.0f} updates/s")
+
+
+def main() -> None:
+    logger.remove()
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    delay = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.0
+    latency = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.0
+    asyncio.run(run(total, delay, latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,32 @@
 from aiogram import Bot as AiogramBot
 from aiogram import Dispatcher
-from aiogram.types import Update
+from aiogram.dispatcher.event.bases import MiddlewareType
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import TelegramObject, Update
 from loguru import logger
 
 from src.router import router
-from src.services.logging import configure_logger
+from src.services.fsm import create_storage
+from src.services.logging import (
+    configure_logger,
+    start_update_log_summaries,
+    stop_update_log_summaries,
+)
 from src.services.middlewares.logging import logger_middleware
+from src.services.runner import shard_tokens, supervise
+from src.services.send_queue import close_send_queues
+from src.services.session import create_session
 from src.types.settings import settings
 
-dispatcher = Dispatcher()
+dispatcher = Dispatcher(storage=create_storage())
 
 
-async def on_startup(bot: AiogramBot) -> None:
-    me = await bot.get_me()
+async def on_startup(bot: AiogramBot, bots: list[AiogramBot] | None = None) -> None:
+    for started_bot in bots or [bot]:
+        # cached by the bot, and with the saved state not requested at all
+        me = await started_bot.me()
 
-    logger.info("Starting bot {bot_name}", bot_name=me.full_name)
+        logger.info("Starting bot {bot_name}", bot_name=me.full_name)
 
 
 @dispatcher.update()
@@ -22,44 +34,143 @@ async def on_update(event: Update) -> None:
     """Test-handler for logs"""
 
 
-def main() -> None:
-    configure_logger()
-    main_bot = AiogramBot(token=settings.bot_token)
+def register_handler_middleware(middleware: MiddlewareType[TelegramObject]) -> None:
+    """Wrap every handler in the middleware once, the included routers inherit the inner middlewares of the dispatcher"""
+    for event_name, observer in dispatcher.observers.items():
+        if event_name not in ("update", "error"):
+            observer.middleware(middleware)
+
+
+def setup_dispatcher() -> list[str]:
+    """Register middlewares, routers and hooks on the dispatcher and return the update types to receive"""
+    checkpoint = None
+    if settings.run_mode == "polling":
+        from src.services.checkpoint import UpdateCheckpoint
+
+        checkpoint = UpdateCheckpoint(
+            settings.state_file or None,
+            drain_timeout=settings.shutdown_drain_timeout,
+            save_interval=settings.state_save_interval,
+        )
+        dispatcher.update.outer_middleware(checkpoint.middleware)  # type: ignore
+        # the polling loop of the dispatcher confirms the updates as soon as they're received
+        dispatcher._listen_updates = checkpoint.listen_updates  # type: ignore[method-assign]
+        dispatcher.startup.register(checkpoint.start)
+        # before the FSM storage closing registered by the dispatcher itself and the hooks registered below,
+        # so the updates are drained before anything they use is closed
+        dispatcher.shutdown.handlers.insert(0, HandlerObject(callback=checkpoint.stop))
+
+    if settings.record_updates:
+        from src.services.recorder import UpdateRecorder
+
+        recorder = UpdateRecorder(settings.record_updates)
+        dispatcher.update.middleware(recorder.middleware)  # type: ignore
+        dispatcher.shutdown.register(recorder.close)
 
     dispatcher.update.middleware(logger_middleware)  # type: ignore
     dispatcher.startup.register(on_startup)
+    dispatcher.startup.register(start_update_log_summaries)
+    # after the drains, so the updates suppressed while finishing are reported too
+    dispatcher.shutdown.register(stop_update_log_summaries)
+    dispatcher.shutdown.register(close_send_queues)
 
     dispatcher.include_router(router)
 
-    dispatcher.run_polling(
-        main_bot,
-        # all for testing purposes
-        allowed_updates=[
-            "message",
-            "edited_message",
-            "channel_post",
-            "edited_channel_post",
-            "inline_query",
-            "chosen_inline_result",
-            "callback_query",
-            "shipping_query",
-            "pre_checkout_query",
-            "poll",
-            "poll_answer",
-            "my_chat_member",
-            "chat_member",
-            "chat_join_request",
-            "message_reaction",
-            "message_reaction_count",
-            "chat_boost",
-            "removed_chat_boost",
-            "deleted_business_messages",
-            "business_connection",
-            "edited_business_message",
-            "business_message",
-            "purchased_paid_media",
-        ],
-    )
+    if settings.scheduler_enabled:
+        from src.services.scheduler import UpdateScheduler
+
+        scheduler = UpdateScheduler(
+            settings.scheduler_concurrency,
+            settings.scheduler_max_pending,
+            drain_timeout=settings.shutdown_drain_timeout,
+        )
+        dispatcher.update.outer_middleware(scheduler.middleware)  # type: ignore
+        if checkpoint is None:
+            # before the FSM storage and the send queues are closed, in polling mode the checkpoint drains them
+            dispatcher.shutdown.handlers.insert(0, HandlerObject(callback=scheduler.close))
+
+    if settings.metrics_enabled:
+        from src.services.metrics import start_metrics_server, stop_metrics_server
+        from src.services.middlewares.metrics import (
+            handler_metrics_middleware,
+            update_metrics_middleware,
+        )
+
+        dispatcher.update.middleware(update_metrics_middleware)  # type: ignore
+        register_handler_middleware(handler_metrics_middleware)  # type: ignore
+        dispatcher.startup.register(start_metrics_server)
+        dispatcher.shutdown.register(stop_metrics_server)
+
+    if settings.tracing_enabled:
+        from src.services.tracing import UpdateTracer
+
+        tracer = UpdateTracer(
+            slow_budget=settings.slow_update_budget,
+            check_interval=settings.slow_update_check_interval,
+            lag_threshold=settings.loop_lag_threshold,
+            lag_interval=settings.loop_lag_interval,
+        )
+        # after the scheduler, so the trace starts when the update is actually processed
+        dispatcher.update.outer_middleware(tracer.middleware)  # type: ignore
+        dispatcher.update.middleware(tracer.update_middleware)  # type: ignore
+        register_handler_middleware(tracer.handler_middleware)  # type: ignore
+        dispatcher.startup.register(tracer.start)
+        dispatcher.shutdown.register(tracer.stop)
+
+    if checkpoint is not None:
+        # the last inner middleware, an update is processed when it's done with it
+        dispatcher.update.middleware(checkpoint.processed_middleware)  # type: ignore
+
+    allowed_updates = settings.allowed_updates
+    if allowed_updates is None:
+        allowed_updates = dispatcher.resolve_used_update_types()
+    logger.info("Receiving updates: {allowed_updates}", allowed_updates=", ".join(allowed_updates) or "default")
+    return allowed_updates
+
+
+def run_bots(tokens: list[str], worker: int = 0) -> None:
+    """Run the bots in this process, all of them share the dispatcher and the HTTP session"""
+    # every worker process serves its own metrics
+    settings.metrics_port += worker
+    if worker and settings.record_updates:
+        from src.services.recorder import worker_path
+
+        settings.record_updates = worker_path(settings.record_updates, worker)
+    if worker and settings.state_file:
+        from src.services.recorder import worker_path
+
+        settings.state_file = worker_path(settings.state_file, worker)
+
+    session = create_session()
+    bots = [AiogramBot(token=token, session=session) for token in tokens]
+
+    allowed_updates = setup_dispatcher()
+
+    if settings.run_mode == "webhook":
+        from src.services.webhook import run_webhook
+
+        run_webhook(dispatcher, bots[0], allowed_updates=allowed_updates)
+    else:
+        dispatcher.run_polling(
+            *bots,
+            allowed_updates=allowed_updates,
+            # the scheduler makes its own tasks and holds back the polling when it's full
+            handle_as_tasks=not settings.scheduler_enabled,
+        )
+
+
+def main() -> None:
+    tokens = settings.tokens
+    if settings.run_mode == "webhook" and (len(tokens) > 1 or settings.bot_processes > 1):
+        raise ValueError("Webhook mode supports a single bot in a single process")
+
+    if settings.bot_processes > 1 and len(tokens) > 1:
+        # records of the forked workers are sent to this process and written by its sink
+        configure_logger(enqueue=True)
+        supervise(shard_tokens(tokens, settings.bot_processes), run_bots)
+    else:
+        configure_logger()
+        run_bots(tokens)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,157 @@
+"""
+Replays a recording of updates (``RECORD_UPDATES=updates.jsonl.gz``) through the dispatcher against a stub bot.
+
+Reports the throughput, latency percentiles of ``feed_update`` and the memory high-water mark.
+Requests to the Bot API are answered by the stub with ``True`` after ``--api-latency`` milliseconds.
+The settings are read as for the bot, though ``BOT_TOKEN`` can be any, e.g. ``42:REPLAY``.
+With the scheduler enabled the latency is the time until an update is queued.
+"""
+
+import argparse
+import asyncio
+import resource
+import time
+import tracemalloc
+from typing import TYPE_CHECKING, Any, AsyncGenerator
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.types import Update
+from loguru import logger
+
+from src.services.logging import configure_logger
+from src.services.recorder import read_recording
+from src.types.settings import settings
+
+if TYPE_CHECKING:
+    from aiogram.methods import TelegramMethod
+
+
+class StubSession(BaseSession):
+    def __init__(self, latency: float = 0) -> None:
+        super().__init__()
+        self.latency = latency
+        self.requests = 0
+
+    async def make_request(self, bot: Bot, method: "TelegramMethod[Any]", timeout: int | None = None) -> Any:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return True
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: dict[str, Any] | None = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True,
+    ) -> AsyncGenerator[bytes, None]:
+        raise NotImplementedError("The stub bot can't download files")
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+async def replay(args: argparse.Namespace) -> None:
+    # the dispatcher creates its FSM storage on import, after the settings are overridden
+    from src.main import dispatcher, setup_dispatcher
+
+    setup_dispatcher()
+    session = StubSession(args.api_latency / 1000)
+    bot = Bot("42:REPLAY", session=session)
+
+    latencies: list[float] = []
+    errors = 0
+    slots = asyncio.Semaphore(args.concurrency)
+    tasks: set[asyncio.Task[None]] = set()
+
+    async def feed(update: Update) -> None:
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            await dispatcher.feed_update(bot, update)
+        except Exception:
+            errors += 1
+        finally:
+            latencies.append(time.perf_counter() - start)
+            slots.release()
+
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    started_at = time.perf_counter()
+    first_time: float | None = None
+    for fed, (update_time, raw_update) in enumerate(read_recording(args.path)):
+        if args.limit and fed >= args.limit:
+            break
+
+        if args.speed > 0:
+            if first_time is None:
+                first_time = update_time
+            delay = started_at + (update_time - first_time) / args.speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        update = Update.model_validate(raw_update, context={"bot": bot})
+        await slots.acquire()
+        task = asyncio.create_task(feed(update))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    while tasks:
+        await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started_at
+
+    traced_peak = tracemalloc.get_traced_memory()[1] if args.tracemalloc else 0
+    await dispatcher.emit_shutdown(bot=bot)
+
+    if not latencies:
+        print("The recording has no updates")
+        return
+
+    latencies.sort()
+    print(f"updates       {len(latencies):,} in {elapsed:.2f}s, {errors:,} failed, {session.requests:,} API requests")
+    print(f"throughput    {len(latencies) / elapsed:,.0f} updates/s")
+    print(
+        "latency       "
+        + "  ".join(
+            f"p{label} {percentile(latencies, fraction) * 1e3:.2f}ms"
+            for label, fraction in (("50", 0.5), ("90", 0.9), ("99", 0.99), ("100", 1.0))
+        )
+    )
+    # ru_maxrss is in KiB on Linux
+    print(f"peak RSS      {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+    if args.tracemalloc:
+        print(f"peak traced   {traced_peak / 1024**2:.1f} MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="recording made with RECORD_UPDATES")
+    parser.add_argument("--speed", type=float, default=0, help="1 keeps the recorded pace, 10 is 10x faster, 0 is max")
+    parser.add_argument("--concurrency", type=int, default=1000, help="updates processed at once at most")
+    parser.add_argument("--limit", type=int, default=0, help="replay only this many updates")
+    parser.add_argument("--api-latency", type=float, default=0, help="stub Bot API latency in ms")
+    parser.add_argument("--log", action="store_true", help="log the updates as usual")
+    parser.add_argument("--tracemalloc", action="store_true", help="trace Python allocations, slows the replay")
+    args = parser.parse_args()
+
+    # nothing of the production state is touched: the offsets, the FSM storage and the recording
+    settings.state_file = ""
+    settings.fsm_storage = "memory"
+    settings.record_updates = ""
+    settings.log_updates = args.log
+    settings.metrics_enabled = False
+    configure_logger()
+    logger.info("Replaying {path}", path=args.path)
+    asyncio.run(replay(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,5 +2,5 @@ from aiogram import Router
 
 from src.router.main import router as main_router
 
-router = Router()
+router = Router(name="root")
 router.include_routers(main_router)
@@ -1,3 +1,3 @@
 from aiogram import Router
 
-router = Router()
+router = Router(name="main")
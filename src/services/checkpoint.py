@@ -0,0 +1,290 @@
+import asyncio
+import os
+from contextlib import suppress
+from typing import Any, AsyncGenerator, Awaitable, Callable
+
+import orjson
+from aiogram import Bot
+from aiogram.dispatcher.dispatcher import DEFAULT_BACKOFF_CONFIG
+from aiogram.exceptions import TelegramAPIError
+from aiogram.methods import GetUpdates
+from aiogram.types import Update, User
+from aiogram.utils.backoff import Backoff, BackoffConfig
+from loguru import logger
+
+
+class UpdateCheckpoint:
+    """
+    Tracks the updates being processed, so they can be drained on shutdown and polling resumes where it stopped.
+
+    The offset of a bot is the id of its oldest unfinished update or the one after its last processed update.
+    ``listen_updates`` replaces the polling loop of the dispatcher and never confirms an update to Telegram
+    before it's processed, so updates still running when the ``drain_timeout`` is over are received again
+    after the restart. With a ``path`` the offsets, the processed updates above them and the ``get_me`` results
+    of the bots are written to that JSON file every ``save_interval`` seconds and on shutdown. On start the saved
+    users are used instead of calling ``get_me`` and the polling resumes from the saved offsets,
+    skipping the updates processed before the restart.
+
+    ``middleware`` has to be an outer update middleware running before the scheduler
+    and ``processed_middleware`` an inner one, which every update reaches.
+    """
+
+    def __init__(self, path: str | None = None, drain_timeout: float = 10, save_interval: float = 5) -> None:
+        self.path = path
+        self.drain_timeout = drain_timeout
+        self.save_interval = save_interval
+
+        self.resume_offsets: dict[int, int] = {}
+        self.users: dict[int, dict[str, Any]] = {}
+
+        self._pending: dict[int, set[int]] = {}
+        self._last_processed: dict[int, int] = {}
+        # processed above the oldest unfinished update, they are received again and skipped
+        self._processed: dict[int, set[int]] = {}
+        # cancelled before being processed, they are not waited for but keep the offset
+        self._cancelled: dict[int, set[int]] = {}
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._progress = asyncio.Event()
+        self._saver: asyncio.Task[None] | None = None
+        self._refresher: asyncio.Task[None] | None = None
+
+        if path is not None:
+            self.load()
+
+    def load(self) -> None:
+        if self.path is None or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as file:
+                state = orjson.loads(file.read())
+        except (OSError, orjson.JSONDecodeError):
+            logger.exception("Can't read the bot state from {path}, starting from scratch", path=self.path)
+            return
+
+        self.resume_offsets = {int(bot_id): offset for bot_id, offset in state.get("offsets", {}).items()}
+        self._processed = {int(bot_id): set(processed) for bot_id, processed in state.get("processed", {}).items()}
+        self.users = {int(bot_id): user for bot_id, user in state.get("users", {}).items()}
+
+    def save(self) -> None:
+        """Write the state atomically, so a crash while saving keeps the previous one"""
+        if self.path is None:
+            return
+        offsets = self.offsets()
+        state = {
+            "offsets": {str(bot_id): offset for bot_id, offset in offsets.items()},
+            "processed": {
+                str(bot_id): sorted(update_id for update_id in processed if update_id >= offsets[bot_id])
+                for bot_id, processed in self._processed.items()
+                if bot_id in offsets
+            },
+            "users": {str(bot_id): user for bot_id, user in self.users.items()},
+        }
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(orjson.dumps(state))
+        os.replace(temporary_path, self.path)
+
+    def offset(self, bot_id: int) -> int | None:
+        unfinished = self._pending.get(bot_id, set()) | self._cancelled.get(bot_id, set())
+        if unfinished:
+            return min(unfinished)
+        if bot_id in self._last_processed:
+            return self._last_processed[bot_id] + 1
+        return self.resume_offsets.get(bot_id)
+
+    def offsets(self) -> dict[int, int]:
+        bot_ids = (
+            self.resume_offsets.keys() | self._pending.keys() | self._cancelled.keys() | self._last_processed.keys()
+        )
+        return {bot_id: offset for bot_id in bot_ids if (offset := self.offset(bot_id)) is not None}
+
+    @property
+    def in_flight(self) -> int:
+        return sum(len(pending) for pending in self._pending.values())
+
+    def _dispatch(self, bot_id: int, update_id: int) -> None:
+        self._pending.setdefault(bot_id, set()).add(update_id)
+        self._idle.clear()
+
+    def _mark_processed(self, bot_id: int, update_id: int) -> None:
+        self._processed.setdefault(bot_id, set()).add(update_id)
+        if update_id > self._last_processed.get(bot_id, -1):
+            self._last_processed[bot_id] = update_id
+            self._progress.set()
+
+    def _finish(self, bot_id: int, update_id: int) -> None:
+        pending = self._pending.get(bot_id)
+        if pending is None or update_id not in pending:
+            return
+        pending.discard(update_id)
+        self._mark_processed(bot_id, update_id)
+        self._progress.set()
+        if not any(self._pending.values()):
+            self._idle.set()
+
+    def _cancel(self, bot_id: int, update_id: int) -> None:
+        pending = self._pending.get(bot_id)
+        if pending is None or update_id not in pending:
+            return
+        pending.discard(update_id)
+        self._cancelled.setdefault(bot_id, set()).add(update_id)
+        if not any(self._pending.values()):
+            self._idle.set()
+
+    async def middleware(
+        self,
+        handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        bot_id = data["bot"].id
+        # already added by the polling loop, updates fed directly are tracked from here
+        self._dispatch(bot_id, event.update_id)
+        try:
+            return await handler(event, data)
+        except Exception:
+            # failed before or while processing, in both cases it won't be processed again
+            self._finish(bot_id, event.update_id)
+            raise
+        except asyncio.CancelledError:
+            # cancelled by the shutdown, e.g. while waiting for a place in the scheduler,
+            # the drain doesn't wait for it and the offset stays at it, so it's received again after the restart
+            self._cancel(bot_id, event.update_id)
+            raise
+
+    async def processed_middleware(
+        self,
+        handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        # a cancelled update isn't processed, it's left to the outer middleware
+        try:
+            result = await handler(event, data)
+        except Exception:
+            self._finish(data["bot"].id, event.update_id)
+            raise
+        self._finish(data["bot"].id, event.update_id)
+        return result
+
+    async def listen_updates(
+        self,
+        bot: Bot,
+        polling_timeout: int = 30,
+        backoff_config: BackoffConfig = DEFAULT_BACKOFF_CONFIG,
+        allowed_updates: list[str] | None = None,
+    ) -> AsyncGenerator[Update, None]:
+        """
+        Polling loop requesting the updates from the offset of the bot instead of the last received update.
+
+        The unfinished updates and the processed ones after them are received again and skipped. When a response
+        has nothing else, the next request waits for an update to finish, so a slow update doesn't make the loop spin.
+        It also means that no more than a getUpdates batch (100 updates) is received past the oldest unfinished one.
+        """
+        backoff = Backoff(config=backoff_config)
+        get_updates = GetUpdates(timeout=polling_timeout, allowed_updates=allowed_updates)
+        kwargs = {}
+        if bot.session.timeout:
+            # the request has to outlive the long polling
+            kwargs["request_timeout"] = int(bot.session.timeout + polling_timeout)
+        failed = False
+        while True:
+            offset = get_updates.offset = self.offset(bot.id)
+            if offset is not None and bot.id in self._processed:
+                self._processed[bot.id] = {update_id for update_id in self._processed[bot.id] if update_id >= offset}
+            self._progress.clear()
+            try:
+                updates = await bot(get_updates, **kwargs)
+            except Exception as e:
+                failed = True
+                logger.error("Failed to fetch updates of bot {bot_id}: {e!r}", bot_id=bot.id, e=e)
+                await backoff.asleep()
+                continue
+            if failed:
+                logger.info(
+                    "Fetching updates of bot {bot_id} again after {tries} tries", bot_id=bot.id, tries=backoff.counter
+                )
+                backoff.reset()
+                failed = False
+
+            unfinished = self._pending.get(bot.id, set()) | self._cancelled.get(bot.id, set())
+            processed = self._processed.get(bot.id, set())
+            received = 0
+            for update in updates:
+                if update.update_id in unfinished:
+                    continue
+                if update.update_id in processed:
+                    # loaded from the saved state it isn't counted yet
+                    self._mark_processed(bot.id, update.update_id)
+                    continue
+                received += 1
+                self._dispatch(bot.id, update.update_id)
+                yield update
+
+            # the fast decoder moves the offset past the updates failing validation, they count as processed
+            if get_updates.offset is not None and get_updates.offset != offset:
+                self._mark_processed(bot.id, get_updates.offset - 1)
+            if updates and not received:
+                with suppress(TimeoutError):
+                    await asyncio.wait_for(self._progress.wait(), polling_timeout)
+
+    async def _refresh_users(self, bots: list[Bot]) -> None:
+        for bot in bots:
+            try:
+                bot._me = await bot.get_me()
+            except TelegramAPIError as e:
+                logger.warning("Can't refresh the user of bot {bot_id}: {e}", bot_id=bot.id, e=e)
+                continue
+            self.users[bot.id] = bot._me.model_dump(mode="json", exclude_none=True)
+
+    async def _save_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.save_interval)
+            try:
+                await asyncio.to_thread(self.save)
+            except OSError:
+                logger.exception("Can't save the bot state to {path}", path=self.path)
+
+    async def start(self, bot: Bot, bots: list[Bot] | None = None) -> None:
+        """Startup hook warming the bots up with the saved users"""
+        bots = bots or [bot]
+
+        cached = [started_bot for started_bot in bots if started_bot.id in self.users]
+        for started_bot in cached:
+            started_bot._me = User.model_validate(self.users[started_bot.id])
+        # the rest is fetched concurrently instead of one by one by the startup hooks
+        fetched = [started_bot for started_bot in bots if started_bot._me is None]
+        for started_bot, me in zip(fetched, await asyncio.gather(*(started_bot.me() for started_bot in fetched))):
+            self.users[started_bot.id] = me.model_dump(mode="json", exclude_none=True)
+
+        if cached:
+            # the saved users could be outdated, they are refreshed without delaying the start
+            self._refresher = asyncio.create_task(self._refresh_users(cached))
+        if self.path is not None and self.save_interval > 0:
+            self._saver = asyncio.create_task(self._save_periodically())
+
+    async def stop(self) -> None:
+        """Shutdown hook waiting for the updates being processed and saving the offsets"""
+        for task in (self._saver, self._refresher):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._saver = self._refresher = None
+
+        if self.in_flight:
+            logger.info("Waiting for {in_flight} updates to finish", in_flight=self.in_flight)
+            try:
+                await asyncio.wait_for(self._idle.wait(), self.drain_timeout)
+            except TimeoutError:
+                logger.warning(
+                    "{in_flight} updates didn't finish in {timeout}s, Telegram sends them again after the restart: "
+                    "{offsets}",
+                    in_flight=self.in_flight,
+                    timeout=self.drain_timeout,
+                    offsets=self.offsets(),
+                )
+
+        if self.path is not None:
+            await asyncio.to_thread(self.save)
+            logger.info("Saved the update offsets to {path}: {offsets}", path=self.path, offsets=self.offsets())
@@ -0,0 +1,79 @@
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any, Iterator, cast
+
+import orjson
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.exceptions import ClientDecodeError
+from aiogram.methods import GetUpdates, Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import Update
+from loguru import logger
+from pydantic import ValidationError
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+
+class LazyUpdates:
+    """
+    Updates of a getUpdates response, validated one by one while the polling loop iterates over them.
+
+    An update failing validation is skipped, and the offset of ``method`` is moved past it.
+    """
+
+    __slots__ = ("raw_updates", "bot", "method")
+
+    def __init__(self, raw_updates: list[dict[str, Any]], bot: "Bot", method: GetUpdates | None = None) -> None:
+        self.raw_updates = raw_updates
+        self.bot = bot
+        self.method = method
+
+    def __len__(self) -> int:
+        return len(self.raw_updates)
+
+    def __iter__(self) -> Iterator[Update]:
+        context = {"bot": self.bot}
+        for raw_update in self.raw_updates:
+            try:
+                yield Update.model_validate(raw_update, context=context)
+            except ValidationError as e:
+                update_id = raw_update.get("update_id")
+                logger.error(
+                    "Skipping update with id {update_id} that failed validation: {error}",
+                    update_id=update_id,
+                    error=e,
+                )
+                # the polling loop moves the offset only past the yielded updates,
+                # without this an invalid last update of the batch would be fetched again forever
+                if self.method is not None and type(update_id) is int:
+                    self.method.offset = update_id + 1
+
+
+class FastDecodeSession(AiohttpSession):
+    """
+    Session decoding responses with orjson.
+
+    A successful getUpdates response is not validated as a whole: the polling loop gets :class:`LazyUpdates`,
+    so the first update is dispatched after validating only it, and an invalid update is skipped
+    instead of failing the batch. Webhook bodies are decoded by the ``json_loads`` of the session too.
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(json_loads=orjson.loads, **kwargs)
+
+    def check_response(
+        self, bot: "Bot", method: TelegramMethod[TelegramType], status_code: int, content: str
+    ) -> Response[TelegramType]:
+        if type(method) is GetUpdates and status_code == HTTPStatus.OK:
+            try:
+                json_data = self.json_loads(content)
+            except Exception as e:
+                raise ClientDecodeError("Failed to decode object", e, content)
+
+            if json_data.get("ok") is True and type(json_data.get("result")) is list:
+                response = Response[list[Update]].model_construct(
+                    ok=True, result=LazyUpdates(json_data["result"], bot, method)  # type: ignore[arg-type]
+                )
+                return cast(Response[TelegramType], response)
+
+        return super().check_response(bot, method, status_code, content)
@@ -0,0 +1,28 @@
+from typing import Any
+
+from aiogram.dispatcher.middlewares.user_context import EVENT_CONTEXT_KEY, EventContext
+from aiogram.types import Message, Update
+
+
+def update_log_fields(event: Update, data: dict[str, Any]) -> dict[str, Any]:
+    """Structured fields of the update for the JSON log output, without any markup"""
+    fields: dict[str, Any] = {
+        "update_id": event.update_id,
+        "event_type": event.event_type,
+        "user_id": None,
+        "chat_id": None,
+    }
+
+    event_context: EventContext | None = data.get(EVENT_CONTEXT_KEY)
+    if event_context is not None:
+        fields["user_id"] = event_context.user_id
+        fields["chat_id"] = event_context.chat_id
+        if event_context.thread_id is not None:
+            fields["thread_id"] = event_context.thread_id
+
+    message = event.event
+    if isinstance(message, Message):
+        fields["message_id"] = message.message_id
+        fields["content_type"] = message.content_type
+
+    return fields
@@ -1,6 +1,9 @@
-from typing import TYPE_CHECKING, Union
+import re
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Union
 
 from aiogram.enums import ContentType, ReactionTypeType
+from aiogram.types import SharedUser
 
 if TYPE_CHECKING:
     from aiogram.types import (
@@ -10,27 +13,73 @@ if TYPE_CHECKING:
         ReactionTypeCustomEmoji,
         ReactionTypeEmoji,
         ReactionTypePaid,
-        SharedUser,
         ShippingAddress,
         User,
     )
 
 
-message_format_dict = {"<": r"\<", "\n": "<light-yellow>\\n</light-yellow>"}
+message_format_dict = {"\n": "<light-yellow>\\n</light-yellow>"}
 message_format_translate = str.maketrans(message_format_dict)
+# only what loguru would parse as a tag is escaped, and as loguru halves the backslashes before a tag,
+# the ones before it, a newline (it becomes a tag) or the end of the text (a closing tag follows) are doubled
+_markup = re.compile(r"(\\*)(?:(</?(?:[fb]g\s)?[^<>\s]*>)|(?=\n|\Z))")
 
+_text_limit = 512
 
-def chat_log(chat: Union["Chat", "User", "SharedUser", None]) -> str:
+
+def configure_text_limit(limit: int) -> None:
+    """Set the length user texts are cut to in log lines, ``0`` keeps them whole"""
+    global _text_limit
+    _text_limit = limit
+
+
+def _escape_tag(match: re.Match[str]) -> str:
+    backslashes, tag = match.groups()
+    return f"{backslashes * 2}\\{tag}" if tag is not None else backslashes * 2
+
+
+def _escape_markup(text: str) -> str:
+    if "<" in text or "\\" in text:
+        text = _markup.sub(_escape_tag, text)
+    return text.translate(message_format_translate)
+
+
+def escape(text: str) -> str:
+    """
+    User-supplied text escaped for the loguru markup and cut to the text limit.
+
+    Every text, name or title coming from users goes through it, unescaped markup breaks the whole log line.
+    """
+    cut = len(text) - _text_limit if _text_limit else 0
+    if cut > 0:
+        return f"{_escape_markup(text[:_text_limit] + '…')}<fg 127,127,127>(+{cut} chars)</fg 127,127,127>"
+    return _escape_markup(text)
+
+
+@lru_cache(maxsize=1024)
+def render_entity(entity_id: int, first_name: str | None, last_name: str | None) -> str:
+    """
+    Rendered user or chat, memoized as the same users and chats repeat constantly in busy chats.
+
+    Names are part of the key, so a renamed user is simply rendered again and the stale entry gets evicted.
+    """
+    return f"<cyan>{escape(((first_name or '') + ' ' + (last_name or '')).strip())}</cyan><blue>[{entity_id}]</blue>"
+
+
+def configure_entity_cache(max_size: int) -> None:
+    """Recreate the rendered entity cache with the given size, ``0`` disables it"""
+    global render_entity
+    render_entity = lru_cache(maxsize=max_size)(render_entity.__wrapped__)
+
+
+def chat_log(chat: Union["Chat", "User", SharedUser, None]) -> str:
     if chat is None:
         return "<red>Unknown</red>"
 
-    from aiogram.types import SharedUser
-
-    t = f"<cyan>{((chat.first_name or '') + ' ' + (chat.last_name or '')).strip()}</cyan>"
-    if isinstance(chat, SharedUser):
-        return t + f"<blue>[{chat.user_id}]</blue>"
-    else:
-        return t + f"<blue>[{chat.id}]</blue>"
+    # not isinstance, it goes through the slow ModelMetaclass.__instancecheck__ of pydantic
+    if type(chat) is SharedUser:
+        return render_entity(chat.user_id, chat.first_name, chat.last_name)
+    return render_entity(chat.id, chat.first_name, chat.last_name)  # type: ignore[union-attr]
 
 
 def reaction(reaction: Union["ReactionTypeEmoji", "ReactionTypeCustomEmoji", "ReactionTypePaid"]) -> str:
@@ -46,121 +95,271 @@ def reaction(reaction: Union["ReactionTypeEmoji", "ReactionTypeCustomEmoji", "Re
 
 
 def location(location: "Location") -> str:
-    l = f"<green>{location.latitude}' {location.longitude}'</green>"
+    parts = [f"<green>{location.latitude}' {location.longitude}'</green>"]
     if location.horizontal_accuracy:
-        l += f"<fg 127,127,127>(±{location.horizontal_accuracy})</fg 127,127,127>"
+        parts.append(f"<fg 127,127,127>(±{location.horizontal_accuracy})</fg 127,127,127>")
     if location.live_period:
-        l += f"<fg 127,127,127>(live {location.live_period}s)</fg 127,127,127>"
-    return l
+        parts.append(f"<fg 127,127,127>(live {location.live_period}s)</fg 127,127,127>")
+    return "".join(parts)
 
 
 def shipping_address(address: "ShippingAddress") -> str:
-    return ", ".join(
-        p
-        for p in (address.country_code.upper(), address.state, address.city, address.street_line1, address.street_line2)
-        if len(p) > 0
+    return escape(
+        ", ".join(
+            p
+            for p in (
+                address.country_code.upper(),
+                address.state,
+                address.city,
+                address.street_line1,
+                address.street_line2,
+            )
+            if len(p) > 0
+        )
     )
 
 
+ContentFormatter = Callable[["Message"], str | None]
+
+content_formatters: dict[str, ContentFormatter] = {}
+
+
+def register_content_formatter(*content_types: str) -> Callable[[ContentFormatter], ContentFormatter]:
+    """
+    Register a formatter for the given message content types.
+
+    The formatter returns the part of the log line that follows the sender,
+    or ``None`` to fall back to the generic "sent a message with type" line.
+    User-supplied fields of the message must be passed through ``escape``.
+    """
+
+    def decorator(formatter: ContentFormatter) -> ContentFormatter:
+        for content_type in content_types:
+            content_formatters[content_type] = formatter
+        return formatter
+
+    return decorator
+
+
 def message_content(message: "Message") -> str:
-    log_message = chat_log(message.from_user)
-
-    match message.content_type:
-        case ContentType.TEXT if message.text:
-            message_text = message.text.translate(message_format_translate)
-            log_message += f" - <yellow>{message_text}</yellow>"
-        case ContentType.AUDIO if message.audio:
-            log_message += f" - <green>🎶 {message.audio.title.translate(message_format_translate) if message.audio.title is not None else "Audio"} by {message.audio.performer.translate(message_format_translate) if message.audio.performer is not None else "Unknown"}</green>"
-        case ContentType.ANIMATION:
-            log_message += " - <green>🤡 Animation</green>"
-        case ContentType.DOCUMENT if message.document:
-            log_message += f" - <green>📄 {message.document.file_name.translate(message_format_translate) if message.document.file_name is not None else "Document"}{f'<fg 127,127,127>({message.document.file_size} bytes)</fg 127,127,127>' if message.document.file_size else ''}</green>"
-        case ContentType.GAME if message.game:
-            log_message += f" - <green>🎮 {message.game.title.translate(message_format_translate)}</green> - <blue>{message.game.description.translate(message_format_translate)}</blue>"
-            if message.game.text:
-                game_text = message.game.text.translate(message_format_translate)
-                log_message += f"- <yellow>{game_text}</yellow>"
-        case ContentType.PHOTO:
-            log_message += " - <green>🖼️ Photos</green>"
-        case ContentType.STICKER if message.sticker:
-            log_message += f" - <magenta>💌 Sticker{f'<fg 127>[{message.sticker.set_name}]</fg 127>' if message.sticker.set_name else ''}{f'<fg 127>({message.sticker.emoji})</fg 127>' if message.sticker.emoji else ''}</magenta>"
-        case ContentType.STORY if message.story:
-            log_message += f" forwarded a story from {chat_log(message.story.chat)}"
-        case ContentType.VIDEO if message.video:
-            log_message += f" - <green>📺 {message.video.file_name.translate(message_format_translate) if message.video.file_name is not None else "Video"}{f'<fg 127,127,127>({message.video.file_size} bytes)</fg 127,127,127>' if message.video.file_size else ''}</green>"
-        case ContentType.VIDEO_NOTE:
-            log_message += " - <green>⚪ Video note</green>"
-        case ContentType.VOICE:
-            log_message += " - <green>🔊 Voice message</green>"
-        case ContentType.CONTACT if message.contact:
-            log_message += f" sent <cyan>{f'{message.contact.first_name} {message.contact.last_name}'.strip()}</cyan>{f'<blue>[{message.contact.user_id}]</blue>' if message.contact.user_id else ''} contact with phone <red>{message.contact.phone_number}<red>"
-        case ContentType.DICE if message.dice:
-            log_message += f" - <magenta>{message.dice.emoji} Dice - {message.dice.value}<magenta>"
-        case ContentType.POLL if message.poll:
-            log_message += f" sent a poll <red>{message.poll.question}</red><light-red>[{message.poll.id}]</light-red> with options <yellow>[{', '.join(o.text for o in message.poll.options)}]</yellow>"
-        case ContentType.VENUE if message.venue:
-            log_message += f" - 📍 Venue <green>{message.venue.address}</green> - {location(message.venue.location)}"
-        case ContentType.LOCATION if message.location:
-            log_message += f" - 🗺️ Location {location(message.location)}"
-        case ContentType.NEW_CHAT_MEMBERS if message.new_chat_members and message.from_user:
-            if message.from_user.id == message.new_chat_members[0].id:
-                log_message += " joined"
-            else:
-                log_message += f" added [{', '.join(chat_log(u) for u in message.new_chat_members)}]"
-        case ContentType.LEFT_CHAT_MEMBER if message.left_chat_member and message.from_user:
-            if message.from_user.id == message.left_chat_member.id:
-                log_message += " left"
-            else:
-                log_message += f" kicked {chat_log(message.left_chat_member)} from"
-        case ContentType.NEW_CHAT_TITLE if message.new_chat_title:
-            log_message += f" changed title to <green>{message.new_chat_title}</green>"
-        case ContentType.NEW_CHAT_PHOTO:
-            log_message += " changed chat photo"
-        case ContentType.DELETE_CHAT_PHOTO:
-            log_message += " deleted chat photo"
-        case ContentType.GROUP_CHAT_CREATED:
-            log_message += " created group chat"
-        case ContentType.SUPERGROUP_CHAT_CREATED:
-            log_message += " created supergroup chat"
-        case ContentType.CHANNEL_CHAT_CREATED:
-            log_message += " created channel chat"
-        case ContentType.MESSAGE_AUTO_DELETE_TIMER_CHANGED if message.message_auto_delete_timer_changed:
-            log_message += f" changed message auto delete timer to {message.message_auto_delete_timer_changed.message_auto_delete_time} seconds"
-        case ContentType.MIGRATE_TO_CHAT_ID if message.migrate_to_chat_id:
-            log_message += f" migrated to chat {message.migrate_to_chat_id}"
-        case ContentType.MIGRATE_FROM_CHAT_ID if message.migrate_from_chat_id:
-            log_message += f" migrated from chat {message.migrate_from_chat_id}"
-        case ContentType.PINNED_MESSAGE:
-            log_message += " pinned message"
-        case ContentType.INVOICE if message.invoice:
-            log_message += f" sent invoice for <red>{message.invoice.title}</red> <green>{message.invoice.total_amount}<fg 127,127,127>(smallest unit)</fg 127,127,127> {message.invoice.currency.upper()}</green>"
-        case ContentType.SUCCESSFUL_PAYMENT if message.successful_payment:
-            log_message += f" sent payment for <green>{message.successful_payment.total_amount}<fg 127,127,127>(smallest unit)</fg 127,127,127> {message.successful_payment.currency.upper()}</green>"
-        case ContentType.REFUNDED_PAYMENT if message.refunded_payment:
-            log_message += f" refunded payment for <green>{message.refunded_payment.total_amount}<fg 127,127,127>(smallest unit)</fg 127,127,127> {message.refunded_payment.currency.upper()}</green>"
-        case ContentType.USERS_SHARED if message.users_shared:
-            log_message += f" shared {', '.join(chat_log(u) for u in message.users_shared.users)}"
-        case ContentType.CHAT_SHARED if message.chat_shared:
-            log_message += f" shared chat <cyan>{message.chat_shared.title or "Chat"}</cyan><blue>{message.chat_shared.chat_id}</blue>"
-        case ContentType.CHAT_BACKGROUND_SET:
-            log_message += " set chat background"
-        case ContentType.FORUM_TOPIC_CREATED if message.forum_topic_created:
-            log_message += f" created forum topic <red>{message.forum_topic_created.name}</red>"
-        case ContentType.FORUM_TOPIC_CLOSED:
-            log_message += " closed forum topic"
-        case ContentType.FORUM_TOPIC_EDITED:
-            log_message += " edited forum topic"
-        case ContentType.FORUM_TOPIC_REOPENED:
-            log_message += " reopened forum topic"
-        case ContentType.GENERAL_FORUM_TOPIC_HIDDEN:
-            log_message += " hidden forum topic"
-        case ContentType.GENERAL_FORUM_TOPIC_UNHIDDEN:
-            log_message += " unhidden forum topic"
-        case _:
-            log_message += f" sent a message with type <cyan>{message.content_type}</cyan>"
+    formatter = content_formatters.get(message.content_type)
+    content = formatter(message) if formatter is not None else None
+    if content is None:
+        content = f" sent a message with type <cyan>{message.content_type}</cyan>"
 
     if message.caption:
-        caption_text = message.caption.translate(message_format_translate)
-        log_message += f" - <yellow>{caption_text}</yellow>"
+        return f"{chat_log(message.from_user)}{content} - <yellow>{escape(message.caption)}</yellow>"
+    return chat_log(message.from_user) + content
+
+
+def static_content(text: str) -> ContentFormatter:
+    return lambda message: text
+
+
+content_formatters.update(
+    {
+        ContentType.ANIMATION: static_content(" - <green>🤡 Animation</green>"),
+        ContentType.PHOTO: static_content(" - <green>🖼️ Photos</green>"),
+        ContentType.VIDEO_NOTE: static_content(" - <green>⚪ Video note</green>"),
+        ContentType.VOICE: static_content(" - <green>🔊 Voice message</green>"),
+        ContentType.NEW_CHAT_PHOTO: static_content(" changed chat photo"),
+        ContentType.DELETE_CHAT_PHOTO: static_content(" deleted chat photo"),
+        ContentType.GROUP_CHAT_CREATED: static_content(" created group chat"),
+        ContentType.SUPERGROUP_CHAT_CREATED: static_content(" created supergroup chat"),
+        ContentType.CHANNEL_CHAT_CREATED: static_content(" created channel chat"),
+        ContentType.PINNED_MESSAGE: static_content(" pinned message"),
+        ContentType.CHAT_BACKGROUND_SET: static_content(" set chat background"),
+        ContentType.FORUM_TOPIC_CLOSED: static_content(" closed forum topic"),
+        ContentType.FORUM_TOPIC_EDITED: static_content(" edited forum topic"),
+        ContentType.FORUM_TOPIC_REOPENED: static_content(" reopened forum topic"),
+        ContentType.GENERAL_FORUM_TOPIC_HIDDEN: static_content(" hidden forum topic"),
+        ContentType.GENERAL_FORUM_TOPIC_UNHIDDEN: static_content(" unhidden forum topic"),
+    }
+)
+
+
+@register_content_formatter(ContentType.TEXT)
+def text_content(message: "Message") -> str | None:
+    if not message.text:
+        return None
+    return f" - <yellow>{escape(message.text)}</yellow>"
+
+
+@register_content_formatter(ContentType.AUDIO)
+def audio_content(message: "Message") -> str | None:
+    if not message.audio:
+        return None
+    title = escape(message.audio.title) if message.audio.title is not None else "Audio"
+    performer = escape(message.audio.performer) if message.audio.performer is not None else "Unknown"
+    return f" - <green>🎶 {title} by {performer}</green>"
+
+
+def file_size(size: int | None) -> str:
+    return f"<fg 127,127,127>({size} bytes)</fg 127,127,127>" if size else ""
+
+
+@register_content_formatter(ContentType.DOCUMENT)
+def document_content(message: "Message") -> str | None:
+    if not message.document:
+        return None
+    file_name = escape(message.document.file_name) if message.document.file_name is not None else "Document"
+    return f" - <green>📄 {file_name}{file_size(message.document.file_size)}</green>"
+
+
+@register_content_formatter(ContentType.GAME)
+def game_content(message: "Message") -> str | None:
+    if not message.game:
+        return None
+    parts = [
+        f" - <green>🎮 {escape(message.game.title)}</green> - <blue>{escape(message.game.description)}</blue>",
+    ]
+    if message.game.text:
+        parts.append(f" - <yellow>{escape(message.game.text)}</yellow>")
+    return "".join(parts)
+
+
+@register_content_formatter(ContentType.STICKER)
+def sticker_content(message: "Message") -> str | None:
+    if not message.sticker:
+        return None
+    return f" - <magenta>💌 Sticker{f'<fg 127>[{message.sticker.set_name}]</fg 127>' if message.sticker.set_name else ''}{f'<fg 127>({message.sticker.emoji})</fg 127>' if message.sticker.emoji else ''}</magenta>"
+
+
+@register_content_formatter(ContentType.STORY)
+def story_content(message: "Message") -> str | None:
+    if not message.story:
+        return None
+    return f" forwarded a story from {chat_log(message.story.chat)}"
+
+
+@register_content_formatter(ContentType.VIDEO)
+def video_content(message: "Message") -> str | None:
+    if not message.video:
+        return None
+    file_name = escape(message.video.file_name) if message.video.file_name is not None else "Video"
+    return f" - <green>📺 {file_name}{file_size(message.video.file_size)}</green>"
+
+
+@register_content_formatter(ContentType.CONTACT)
+def contact_content(message: "Message") -> str | None:
+    if not message.contact:
+        return None
+    name = escape(f"{message.contact.first_name} {message.contact.last_name or ''}".strip())
+    return f" sent <cyan>{name}</cyan>{f'<blue>[{message.contact.user_id}]</blue>' if message.contact.user_id else ''} contact with phone <red>{escape(message.contact.phone_number)}</red>"
+
+
+@register_content_formatter(ContentType.DICE)
+def dice_content(message: "Message") -> str | None:
+    if not message.dice:
+        return None
+    return f" - <magenta>{message.dice.emoji} Dice - {message.dice.value}</magenta>"
+
+
+@register_content_formatter(ContentType.POLL)
+def poll_content(message: "Message") -> str | None:
+    if not message.poll:
+        return None
+    options = escape(", ".join(o.text for o in message.poll.options))
+    return f" sent a poll <red>{escape(message.poll.question)}</red><light-red>[{message.poll.id}]</light-red> with options <yellow>[{options}]</yellow>"
+
+
+@register_content_formatter(ContentType.VENUE)
+def venue_content(message: "Message") -> str | None:
+    if not message.venue:
+        return None
+    return f" - 📍 Venue <green>{escape(message.venue.address)}</green> - {location(message.venue.location)}"
+
+
+@register_content_formatter(ContentType.LOCATION)
+def location_content(message: "Message") -> str | None:
+    if not message.location:
+        return None
+    return f" - 🗺️ Location {location(message.location)}"
+
+
+@register_content_formatter(ContentType.NEW_CHAT_MEMBERS)
+def new_chat_members_content(message: "Message") -> str | None:
+    if not message.new_chat_members or not message.from_user:
+        return None
+    if message.from_user.id == message.new_chat_members[0].id:
+        return " joined"
+    return f" added [{', '.join(chat_log(u) for u in message.new_chat_members)}]"
+
+
+@register_content_formatter(ContentType.LEFT_CHAT_MEMBER)
+def left_chat_member_content(message: "Message") -> str | None:
+    if not message.left_chat_member or not message.from_user:
+        return None
+    if message.from_user.id == message.left_chat_member.id:
+        return " left"
+    return f" kicked {chat_log(message.left_chat_member)} from"
+
+
+@register_content_formatter(ContentType.NEW_CHAT_TITLE)
+def new_chat_title_content(message: "Message") -> str | None:
+    if not message.new_chat_title:
+        return None
+    return f" changed title to <green>{escape(message.new_chat_title)}</green>"
+
+
+@register_content_formatter(ContentType.MESSAGE_AUTO_DELETE_TIMER_CHANGED)
+def message_auto_delete_timer_changed_content(message: "Message") -> str | None:
+    if not message.message_auto_delete_timer_changed:
+        return None
+    return f" changed message auto delete timer to {message.message_auto_delete_timer_changed.message_auto_delete_time} seconds"
+
+
+@register_content_formatter(ContentType.MIGRATE_TO_CHAT_ID)
+def migrate_to_chat_id_content(message: "Message") -> str | None:
+    if not message.migrate_to_chat_id:
+        return None
+    return f" migrated to chat {message.migrate_to_chat_id}"
+
+
+@register_content_formatter(ContentType.MIGRATE_FROM_CHAT_ID)
+def migrate_from_chat_id_content(message: "Message") -> str | None:
+    if not message.migrate_from_chat_id:
+        return None
+    return f" migrated from chat {message.migrate_from_chat_id}"
+
+
+@register_content_formatter(ContentType.INVOICE)
+def invoice_content(message: "Message") -> str | None:
+    if not message.invoice:
+        return None
+    return f" sent invoice for <red>{escape(message.invoice.title)}</red> <green>{message.invoice.total_amount}<fg 127,127,127>(smallest unit)</fg 127,127,127> {message.invoice.currency.upper()}</green>"
+
+
+@register_content_formatter(ContentType.SUCCESSFUL_PAYMENT)
+def successful_payment_content(message: "Message") -> str | None:
+    if not message.successful_payment:
+        return None
+    return f" sent payment for <green>{message.successful_payment.total_amount}<fg 127,127,127>(smallest unit)</fg 127,127,127> {message.successful_payment.currency.upper()}</green>"
+
+
+@register_content_formatter(ContentType.REFUNDED_PAYMENT)
+def refunded_payment_content(message: "Message") -> str | None:
+    if not message.refunded_payment:
+        return None
+    return f" refunded payment for <green>{message.refunded_payment.total_amount}<fg 127,127,127>(smallest unit)</fg 127,127,127> {message.refunded_payment.currency.upper()}</green>"
+
+
+@register_content_formatter(ContentType.USERS_SHARED)
+def users_shared_content(message: "Message") -> str | None:
+    if not message.users_shared:
+        return None
+    return f" shared {', '.join(chat_log(u) for u in message.users_shared.users)}"
+
+
+@register_content_formatter(ContentType.CHAT_SHARED)
+def chat_shared_content(message: "Message") -> str | None:
+    if not message.chat_shared:
+        return None
+    return f" shared chat <cyan>{escape(message.chat_shared.title) if message.chat_shared.title else "Chat"}</cyan><blue>{message.chat_shared.chat_id}</blue>"
+
 
-    return log_message
+@register_content_formatter(ContentType.FORUM_TOPIC_CREATED)
+def forum_topic_created_content(message: "Message") -> str | None:
+    if not message.forum_topic_created:
+        return None
+    return f" created forum topic <red>{escape(message.forum_topic_created.name)}</red>"
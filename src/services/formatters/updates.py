@@ -0,0 +1,283 @@
+from typing import TYPE_CHECKING, Callable, cast
+
+from aiogram.types import ChatMemberBanned, ChatMemberLeft, InaccessibleMessage
+
+from src.services.formatters.logs import (
+    chat_log,
+    escape,
+    location,
+    message_content,
+    reaction,
+    shipping_address,
+)
+
+if TYPE_CHECKING:
+    from aiogram.types import (
+        BusinessConnection,
+        BusinessMessagesDeleted,
+        CallbackQuery,
+        ChatBoostRemoved,
+        ChatBoostUpdated,
+        ChatJoinRequest,
+        ChatMemberUpdated,
+        ChosenInlineResult,
+        InlineQuery,
+        Message,
+        MessageReactionCountUpdated,
+        MessageReactionUpdated,
+        PaidMediaPurchased,
+        Poll,
+        PollAnswer,
+        PreCheckoutQuery,
+        ShippingQuery,
+        Update,
+    )
+
+UpdateFormatter = Callable[["Update"], str]
+
+update_formatters: dict[str, UpdateFormatter] = {}
+
+
+def register_update_formatter(*event_types: str) -> Callable[[UpdateFormatter], UpdateFormatter]:
+    """Register a formatter for the given update event types, replacing the existing one"""
+
+    def decorator(formatter: UpdateFormatter) -> UpdateFormatter:
+        for event_type in event_types:
+            update_formatters[event_type] = formatter
+        return formatter
+
+    return decorator
+
+
+def update_log_message(event: "Update") -> str:
+    formatter = update_formatters.get(event.event_type)
+    if formatter is None:
+        return f"Update with id {event.update_id}"
+    return formatter(event)
+
+
+@register_update_formatter(
+    "message",
+    "business_message",
+    "edited_message",
+    "edited_business_message",
+    "edited_channel_post",
+    "channel_post",
+)
+def message_update(event: "Update") -> str:
+    message: "Message" = cast("Message", event.event)
+
+    parts = [message_content(message)]
+
+    if message.from_user is not None and message.from_user.id != message.chat.id:
+        parts.append(f" in {"channel" if "channel_post" in event.event_type else "chat"} {chat_log(message.chat)}")
+
+    if "edited" in event.event_type:
+        parts.append(" <fg 127,127,127>(edited)</fg 127,127,127>")
+
+    if "business" in event.event_type:
+        parts.append(" <fg 127,127,127>(business)</fg 127,127,127>")
+
+    return "".join(parts)
+
+
+@register_update_formatter("business_connection")
+def business_connection_update(event: "Update") -> str:
+    business_connection: "BusinessConnection" = cast("BusinessConnection", event.business_connection)
+
+    parts = [
+        f"Business mode was {'<green>enabled</green>' if business_connection.is_enabled else '<red>disabled</red>'}"
+    ]
+    if business_connection.is_enabled:
+        parts.append(
+            f" {'<green>with</green>' if business_connection.can_reply else '<red>without</red>'} permission to reply"
+        )
+
+    parts.append(f" for {chat_log(business_connection.user)}")
+    return "".join(parts)
+
+
+@register_update_formatter("deleted_business_messages")
+def deleted_business_messages_update(event: "Update") -> str:
+    deleted_business_messages: "BusinessMessagesDeleted" = cast(
+        "BusinessMessagesDeleted", event.deleted_business_messages
+    )
+
+    return f"{len(deleted_business_messages.message_ids)} Message{'s' if len(deleted_business_messages.message_ids) > 1 else ''}<cyan>[{', '.join(str(i) for i in deleted_business_messages.message_ids)}]</cyan> were deleted in chat {chat_log(deleted_business_messages.chat)}"
+
+
+@register_update_formatter("message_reaction")
+def message_reaction_update(event: "Update") -> str:
+    message_reaction_updated: "MessageReactionUpdated" = cast("MessageReactionUpdated", event.message_reaction)
+    actor = message_reaction_updated.user or message_reaction_updated.actor_chat
+
+    old_reactions = ", ".join(reaction(r) for r in message_reaction_updated.old_reaction)
+    new_reactions = ", ".join(reaction(r) for r in message_reaction_updated.new_reaction)
+
+    parts = [chat_log(actor)]
+    if len(message_reaction_updated.old_reaction) > 0 and len(message_reaction_updated.new_reaction) > 0:
+        parts.append(f" changed reactions from [{old_reactions}] to [{new_reactions}] on")
+    elif len(message_reaction_updated.new_reaction) == 0:
+        parts.append(f" removed [{old_reactions}] reaction from")
+    else:
+        parts.append(f" added [{new_reactions}] reactions to")
+
+    parts.append(f" message <red>{message_reaction_updated.message_id}</red>")
+
+    if actor and actor.id != message_reaction_updated.chat.id:
+        parts.append(f" in chat {chat_log(message_reaction_updated.chat)}")
+    return "".join(parts)
+
+
+@register_update_formatter("message_reaction_count")
+def message_reaction_count_update(event: "Update") -> str:
+    message_reaction_count_updated: "MessageReactionCountUpdated" = cast(
+        "MessageReactionCountUpdated", event.message_reaction_count
+    )
+
+    reactions = ", ".join(
+        f"{str(r.type)}<fg 127,127,127>({r.total_count})</fg 127,127,127>"
+        for r in message_reaction_count_updated.reactions
+    )
+    return f"Reactions were updated to [{reactions}] on message <red>{message_reaction_count_updated.message_id}</red> in chat {chat_log(message_reaction_count_updated.chat)}"
+
+
+@register_update_formatter("inline_query")
+def inline_query_update(event: "Update") -> str:
+    inline_query: "InlineQuery" = cast("InlineQuery", event.inline_query)
+
+    parts = [f"{chat_log(inline_query.from_user)} - <yellow>{escape(inline_query.query)}</yellow>"]
+    if inline_query.chat_type is not None:
+        parts.append(f" in <cyan>{inline_query.chat_type}</cyan>")
+    if len(inline_query.offset) > 0:
+        parts.append(f" with offset <yellow>{escape(inline_query.offset)}</yellow>")
+    if inline_query.location:
+        parts.append(f" located in {location(inline_query.location)}")
+    return "".join(parts)
+
+
+@register_update_formatter("chosen_inline_result")
+def chosen_inline_result_update(event: "Update") -> str:
+    chosen_inline_result: "ChosenInlineResult" = cast("ChosenInlineResult", event.chosen_inline_result)
+
+    parts = [
+        f"{chat_log(chosen_inline_result.from_user)} chosen <red>result</red><light-red>[{escape(chosen_inline_result.result_id)}]</light-red> for query <yellow>{escape(chosen_inline_result.query)}</yellow>"
+    ]
+    if chosen_inline_result.inline_message_id:
+        parts.append(f" for message <red>{chosen_inline_result.inline_message_id}</red>")
+    if chosen_inline_result.location:
+        parts.append(f" located in {location(chosen_inline_result.location)}")
+    return "".join(parts)
+
+
+@register_update_formatter("callback_query")
+def callback_query_update(event: "Update") -> str:
+    callback_query: "CallbackQuery" = cast("CallbackQuery", event.callback_query)
+
+    parts = [chat_log(callback_query.from_user)]
+
+    if callback_query.data:
+        parts.append(f" - <yellow>{escape(callback_query.data)}</yellow>")
+
+    if callback_query.message is not None:
+        if isinstance(callback_query.message, InaccessibleMessage):
+            message_text = "Unknown text"
+        else:
+            message_text = message_content(callback_query.message)
+        parts.append(
+            f" on message <yellow>{message_text}</yellow><fg #FF8C00>[{callback_query.message.message_id}]</fg #FF8C00>"
+        )
+        if callback_query.from_user.id != callback_query.message.chat.id:
+            parts.append(f" in chat {chat_log(callback_query.message.chat)}")
+    return "".join(parts)
+
+
+@register_update_formatter("shipping_query")
+def shipping_query_update(event: "Update") -> str:
+    shipping_query: "ShippingQuery" = cast("ShippingQuery", event.shipping_query)
+
+    return f"{chat_log(shipping_query.from_user)} ordered a shipping<red>[{escape(shipping_query.invoice_payload)}]</red> query<red>[{shipping_query.id}]</red> on address <green>{shipping_address(shipping_query.shipping_address)}</green>"
+
+
+@register_update_formatter("pre_checkout_query")
+def pre_checkout_query_update(event: "Update") -> str:
+    pre_checkout_query: "PreCheckoutQuery" = cast("PreCheckoutQuery", event.pre_checkout_query)
+
+    return f"{chat_log(pre_checkout_query.from_user)} placed a pre-checkout<red>[{escape(pre_checkout_query.invoice_payload)}]</red> query<red>[{pre_checkout_query.id}]</red> for <green>{pre_checkout_query.total_amount}<fg 127,127,127>(smallest unit)</fg 127,127,127> {pre_checkout_query.currency.upper()}</green>"
+
+
+@register_update_formatter("purchased_paid_media")
+def purchased_paid_media_update(event: "Update") -> str:
+    purchased_paid_media: "PaidMediaPurchased" = cast("PaidMediaPurchased", event.purchased_paid_media)
+
+    return f"{chat_log(purchased_paid_media.from_user)} purchased a media<red>[{escape(purchased_paid_media.paid_media_payload)}]</red>"
+
+
+@register_update_formatter("poll")
+def poll_update(event: "Update") -> str:
+    poll: "Poll" = cast("Poll", event.poll)
+
+    options = ", ".join(f"{escape(o.text)}<fg 127,127,127>({o.voter_count})</fg 127,127,127>" for o in poll.options)
+    return f"<red>{escape(poll.question)}</red><light-red>[{poll.id}]</light-red> with options <yellow>[{options}]</yellow> and <green>{poll.total_voter_count}</green> voters{" <red>is closed</red>" if poll.is_closed else ""}"
+
+
+@register_update_formatter("poll_answer")
+def poll_answer_update(event: "Update") -> str:
+    poll_answer: "PollAnswer" = cast("PollAnswer", event.poll_answer)
+
+    voter = poll_answer.voter_chat or poll_answer.user
+
+    if poll_answer.option_ids:
+        action = f" voted for <yellow>[{', '.join(str(o) for o in poll_answer.option_ids)}]</yellow>"
+    else:
+        action = " <red>retracted vote</red>"
+    return (
+        f"{chat_log(voter) if voter else "<cyan>anonymous</cyan>"}{action} on poll <red>[{poll_answer.poll_id}]</red>"
+    )
+
+
+@register_update_formatter("my_chat_member", "chat_member")
+def chat_member_update(event: "Update") -> str:
+    chat_member: "ChatMemberUpdated" = cast("ChatMemberUpdated", event.event)
+
+    assert chat_member.new_chat_member
+
+    parts = [chat_log(chat_member.from_user)]
+    match chat_member.new_chat_member.status:
+        case "kicked" if isinstance(chat_member.new_chat_member, ChatMemberBanned):
+            parts.append(f" banned {chat_log(chat_member.new_chat_member.user)}")
+            if not chat_member.new_chat_member.until_date or chat_member.new_chat_member.until_date.timestamp() == 0:
+                parts.append(" <red>permanently</red>")
+            else:
+                parts.append(f" <red>until {chat_member.new_chat_member.until_date.isoformat()}</red>")
+
+        case "left" if isinstance(chat_member.new_chat_member, ChatMemberLeft):
+            parts.append(f" left {chat_log(chat_member.new_chat_member.user)}")
+
+        case _:
+            parts.append(f" changed status to <yellow>{chat_member.new_chat_member.status}</yellow>")
+
+    if chat_member.chat.id != chat_member.from_user.id:
+        parts.append(f" in chat {chat_log(chat_member.chat)}")
+    return "".join(parts)
+
+
+@register_update_formatter("chat_join_request")
+def chat_join_request_update(event: "Update") -> str:
+    chat_join_request: "ChatJoinRequest" = cast("ChatJoinRequest", event.event)
+
+    return f"{chat_log(chat_join_request.from_user)} requested to join {chat_log(chat_join_request.chat)}"
+
+
+@register_update_formatter("chat_boost")
+def chat_boost_update(event: "Update") -> str:
+    chat_boost: "ChatBoostUpdated" = cast("ChatBoostUpdated", event.chat_boost)
+
+    return f"{chat_log(chat_boost.chat)} was boosted"
+
+
+@register_update_formatter("removed_chat_boost")
+def removed_chat_boost_update(event: "Update") -> str:
+    removed_chat_boost: "ChatBoostRemoved" = cast("ChatBoostRemoved", event.removed_chat_boost)
+
+    return f"chat boost was removed from {chat_log(removed_chat_boost.chat)}"
@@ -0,0 +1,31 @@
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from src.types.settings import settings
+
+
+def create_storage() -> BaseStorage:
+    """Create the FSM storage from settings, durable ones get an in-process cache in front"""
+    if settings.fsm_storage == "memory":
+        return MemoryStorage()
+
+    from src.services.storage.base import DurableStorage
+    from src.services.storage.cache import CachedStorage
+
+    backend: DurableStorage
+    if settings.fsm_storage == "sqlite":
+        from src.services.storage.sqlite import SQLiteStorage
+
+        backend = SQLiteStorage(settings.fsm_storage_url or "fsm.sqlite3")
+    else:
+        from src.services.storage.redis import RedisStorage
+
+        backend = RedisStorage.from_url(settings.fsm_storage_url or "redis://localhost:6379/0")
+
+    return CachedStorage(
+        backend,
+        max_size=settings.fsm_cache_size,
+        flush_interval=settings.fsm_flush_interval,
+        batch_size=settings.fsm_flush_batch_size,
+        stats_interval=settings.fsm_stats_interval,
+    )
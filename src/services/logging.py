@@ -1,19 +1,96 @@
 import sys
+import traceback
+from typing import Hashable, TextIO
 
+import orjson
 from loguru import logger
 
+from src.services.formatters.logs import configure_entity_cache, configure_text_limit
+from src.services.sampling import UpdateLogSampler
+from src.services.sinks.queue import QueueSink
+from src.types.settings import settings
+
+_update_logging_enabled = True
+_update_log_sampler: UpdateLogSampler | None = None
+
+
+def update_logging_enabled() -> bool:
+    """Whether UPDATE records would reach the sink, so the middleware can skip rendering them"""
+    return _update_logging_enabled
+
+
+def sample_update(event_type: str, chat_id: Hashable) -> bool:
+    """Whether this update should be logged according to the configured sampling and rate limits"""
+    return _update_log_sampler is None or _update_log_sampler.allow(event_type, chat_id)
+
+
+async def start_update_log_summaries() -> None:
+    """Startup hook reporting the updates suppressed by the sampling periodically"""
+    if _update_log_sampler is not None:
+        await _update_log_sampler.start()
+
+
+async def stop_update_log_summaries() -> None:
+    """Shutdown hook reporting the updates suppressed since the last summary"""
+    if _update_log_sampler is not None:
+        await _update_log_sampler.stop()
+
+
+def configure_logger(stream: TextIO | None = None, enqueue: bool = False) -> None:
+    """
+    Configure the loguru logger to write to ``stream``, stdout by default.
+
+    With ``enqueue`` the records are passed to the sink through a multiprocessing queue,
+    so forked worker processes log through the sink of this process.
+    """
+    global _update_logging_enabled, _update_log_sampler
+
+    stream = stream or sys.stdout
 
-def configure_logger() -> None:
     log_format_all = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <9}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>\n{exception}"
     log_format_update = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <9}</level> | {extra[update_type]} | {message}\n{exception}"
 
+    log_format_traced = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <9}</level> | <fg 127,127,127>{extra[trace_id]}</fg 127,127,127> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>\n{exception}"
+    log_format_update_traced = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <9}</level> | <fg 127,127,127>{extra[trace_id]}</fg 127,127,127> | {extra[update_type]} | {message}\n{exception}"
+
     def log_format(record: "Record") -> str:  # type: ignore
+        traced = "trace_id" in record["extra"]
         if record["level"].name == "UPDATE":
-            return log_format_update
-        return log_format_all
+            return log_format_update_traced if traced else log_format_update
+        return log_format_traced if traced else log_format_all
+
+    def json_log_format(record: "Record") -> str:  # type: ignore
+        payload = {
+            "time": record["time"].isoformat(),
+            "level": record["level"].name,
+            "name": record["name"],
+            "function": record["function"],
+            "line": record["line"],
+            "message": record["message"],
+            **record["extra"],
+        }
+        if record["exception"] is not None:
+            payload["exception"] = "".join(traceback.format_exception(*record["exception"]))
+
+        record["extra"]["serialized"] = orjson.dumps(payload, default=str).decode()
+        return "{extra[serialized]}\n"
+
+    sink: TextIO | QueueSink = stream
+    if settings.log_sink == "queue":
+        sink = QueueSink(
+            stream,
+            max_size=settings.log_queue_size,
+            batch_size=settings.log_queue_batch_size,
+            flush_interval=settings.log_queue_flush_interval,
+            overflow_policy=settings.log_queue_overflow_policy,
+            sample_rate=settings.log_queue_sample_rate,
+        )
 
     logger.remove()
-    logger.add(sys.stdout, colorize=True, format=log_format, diagnose=True, backtrace=True)
+    if settings.tracing_enabled:
+        from src.services.tracing import trace_patcher
+
+        logger.configure(patcher=trace_patcher)
     logger.level("DEBUG", color="<fg #7f7f7f>")
     logger.level("INFO", color="<white>")
     logger.level("SUCCESS", color="<green>")
@@ -21,3 +98,29 @@ def configure_logger() -> None:
     logger.level("ERROR", color="<red>")
     logger.level("CRITICAL", color="<bold><white><RED>")
     logger.level("UPDATE", no=38, color="<magenta>")
+    if settings.log_mode == "json":
+        logger.add(sink, colorize=False, format=json_log_format, level=settings.log_level, enqueue=enqueue)
+    else:
+        logger.add(
+            sink,
+            colorize=True,
+            format=log_format,
+            level=settings.log_level,
+            diagnose=True,
+            backtrace=True,
+            enqueue=enqueue,
+        )
+
+    configure_entity_cache(settings.entity_cache_size)
+    configure_text_limit(settings.log_text_limit)
+
+    _update_log_sampler = None
+    if settings.log_sample_rates or settings.log_rate_limit > 0:
+        _update_log_sampler = UpdateLogSampler(
+            settings.log_sample_rates,
+            rate=settings.log_rate_limit,
+            burst=settings.log_rate_burst,
+            summary_interval=settings.log_summary_interval,
+        )
+
+    _update_logging_enabled = settings.log_updates and logger.level("UPDATE").no >= logger.level(settings.log_level).no
@@ -0,0 +1,207 @@
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Callable, Iterable, TypeVar
+
+from loguru import logger
+
+from src.services.formatters import logs
+from src.types.settings import settings
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = tuple[str, ...]
+
+
+def _labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class HistogramFamily:
+    def __init__(
+        self, name: str, documentation: str, label_names: tuple[str, ...], buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self.histograms: dict[LabelValues, Histogram] = {}
+
+    def observe(self, labels: LabelValues, value: float) -> None:
+        histogram = self.histograms.get(labels)
+        if histogram is None:
+            histogram = self.histograms[labels] = Histogram(self.buckets)
+        # inlined Histogram.observe, this is called for every update
+        histogram.counts[bisect_left(self.buckets, value)] += 1
+        histogram.sum += value
+        histogram.count += 1
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, histogram in self.histograms.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), histogram.counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(self.label_names, labels, f'le="{bound}"')} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {histogram.sum}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {histogram.count}"
+
+
+Collector = Callable[[], dict[LabelValues, float]]
+
+
+class CounterFamily:
+    def __init__(
+        self, name: str, documentation: str, label_names: tuple[str, ...], collect: Collector | None = None
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.values: dict[LabelValues, float] = {}
+        self.collect = collect
+
+    def inc(self, labels: LabelValues, value: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        values = self.collect() if self.collect is not None else self.values
+        for labels, value in values.items():
+            yield f"{self.name}{_labels(self.label_names, labels)} {value}"
+
+
+class GaugeFamily:
+    def __init__(
+        self, name: str, documentation: str, label_names: tuple[str, ...], collect: Collector | None = None
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.values: dict[LabelValues, float] = {}
+        self.collect = collect
+
+    def set(self, labels: LabelValues, value: float) -> None:
+        self.values[labels] = value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        values = self.collect() if self.collect is not None else self.values
+        for labels, value in values.items():
+            yield f"{self.name}{_labels(self.label_names, labels)} {value}"
+
+
+MetricFamily = TypeVar("MetricFamily", HistogramFamily, CounterFamily, GaugeFamily)
+
+metric_families: list[HistogramFamily | CounterFamily | GaugeFamily] = []
+
+
+def register_metric(family: MetricFamily) -> MetricFamily:
+    metric_families.append(family)
+    return family
+
+
+update_latency = register_metric(
+    HistogramFamily("bot_update_duration_seconds", "Time spent processing an update", ("event_type",))
+)
+update_errors = register_metric(
+    CounterFamily("bot_update_errors_total", "Updates whose processing raised an exception", ("event_type",))
+)
+handler_latency = register_metric(
+    HistogramFamily("bot_handler_duration_seconds", "Time spent in a handler", ("event_type", "router", "handler"))
+)
+handler_errors = register_metric(
+    CounterFamily(
+        "bot_handler_errors_total", "Handler calls that raised an exception", ("event_type", "router", "handler")
+    )
+)
+api_request_latency = register_metric(
+    HistogramFamily("bot_api_request_duration_seconds", "Time spent in a Bot API request", ("method",))
+)
+api_request_errors = register_metric(
+    CounterFamily("bot_api_request_errors_total", "Bot API requests that failed", ("method", "error"))
+)
+
+register_metric(
+    CounterFamily(
+        "bot_entity_cache_hits_total",
+        "Users and chats rendered for logs from the cache",
+        (),
+        collect=lambda: {(): logs.render_entity.cache_info().hits},
+    )
+)
+register_metric(
+    CounterFamily(
+        "bot_entity_cache_misses_total",
+        "Users and chats rendered for logs from scratch",
+        (),
+        collect=lambda: {(): logs.render_entity.cache_info().misses},
+    )
+)
+register_metric(
+    GaugeFamily(
+        "bot_entity_cache_size",
+        "Users and chats in the rendered entity cache",
+        (),
+        collect=lambda: {(): logs.render_entity.cache_info().currsize},
+    )
+)
+
+
+def render_metrics() -> str:
+    return "\n".join(line for family in metric_families for line in family.render()) + "\n"
+
+
+async def metrics_handler(request: "web.Request") -> "web.Response":
+    from aiohttp import web
+
+    return web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8")
+
+
+_runner: "web.AppRunner | None" = None
+
+
+async def start_metrics_server() -> None:
+    global _runner
+
+    from aiohttp import web
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+
+    _runner = web.AppRunner(app, access_log=None)
+    await _runner.setup()
+    await web.TCPSite(_runner, settings.metrics_host, settings.metrics_port).start()
+
+    logger.info(
+        "Serving metrics on http://{host}:{port}/metrics", host=settings.metrics_host, port=settings.metrics_port
+    )
+
+
+async def stop_metrics_server() -> None:
+    global _runner
+
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
@@ -0,0 +1,78 @@
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import TelegramObject, Update
+
+from src.services.metrics import (
+    api_request_errors,
+    api_request_latency,
+    handler_errors,
+    handler_latency,
+    update_errors,
+    update_latency,
+)
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+    from aiogram.client.session.middlewares.base import NextRequestMiddlewareType
+    from aiogram.methods import Response, TelegramMethod
+
+_handler_names: dict[Callable[..., Any], str] = {}
+
+
+def handler_name(handler: HandlerObject) -> str:
+    name = _handler_names.get(handler.callback)
+    if name is None:
+        callback = handler.callback
+        name = _handler_names[callback] = f"{callback.__module__}.{getattr(callback, '__qualname__', repr(callback))}"
+    return name
+
+
+async def update_metrics_middleware(
+    handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+    event: Update,
+    data: dict[str, Any],
+) -> Any:
+    labels = (event.event_type,)
+    start = time.perf_counter()
+    try:
+        return await handler(event, data)
+    except Exception:
+        update_errors.inc(labels)
+        raise
+    finally:
+        update_latency.observe(labels, time.perf_counter() - start)
+
+
+async def handler_metrics_middleware(
+    handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+    event: TelegramObject,
+    data: dict[str, Any],
+) -> Any:
+    # routers without a name are labeled with their id, which changes on every start
+    labels = (data["event_update"].event_type, data["event_router"].name, handler_name(data["handler"]))
+    start = time.perf_counter()
+    try:
+        return await handler(event, data)
+    except Exception:
+        handler_errors.inc(labels)
+        raise
+    finally:
+        handler_latency.observe(labels, time.perf_counter() - start)
+
+
+async def request_metrics_middleware(
+    make_request: "NextRequestMiddlewareType[Any]",
+    bot: "Bot",
+    method: "TelegramMethod[Any]",
+) -> "Response[Any]":
+    api_method = method.__api_method__
+    start = time.perf_counter()
+    try:
+        return await make_request(bot, method)
+    except Exception as e:
+        api_request_errors.inc((api_method, type(e).__name__))
+        raise
+    finally:
+        api_request_latency.observe((api_method,), time.perf_counter() - start)
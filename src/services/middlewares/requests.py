@@ -0,0 +1,35 @@
+import asyncio
+from typing import TYPE_CHECKING, Any
+
+from aiogram.exceptions import TelegramRetryAfter
+from loguru import logger
+
+from src.types.settings import settings
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+    from aiogram.client.session.middlewares.base import NextRequestMiddlewareType
+    from aiogram.methods import Response, TelegramMethod
+
+
+async def flood_control_middleware(
+    make_request: "NextRequestMiddlewareType[Any]",
+    bot: "Bot",
+    method: "TelegramMethod[Any]",
+) -> "Response[Any]":
+    attempt = 0
+    while True:
+        try:
+            return await make_request(bot, method)
+        except TelegramRetryAfter as e:
+            attempt += 1
+            if attempt > settings.api_retry_attempts or e.retry_after > settings.api_retry_max_delay:
+                raise
+            logger.warning(
+                "Flood control on {method}, retrying in {retry_after}s ({attempt}/{attempts})",
+                method=method.__api_method__,
+                retry_after=e.retry_after,
+                attempt=attempt,
+                attempts=settings.api_retry_attempts,
+            )
+            await asyncio.sleep(e.retry_after)
@@ -0,0 +1,69 @@
+import gzip
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterator
+
+import orjson
+from aiogram.types import Update
+from loguru import logger
+
+from src.services.sinks.queue import QueueSink
+
+
+def worker_path(path: str, worker: int) -> str:
+    """Path of the file of a worker process, ``updates.jsonl.gz`` becomes ``updates-1.jsonl.gz``"""
+    file = Path(path)
+    name, dot, suffixes = file.name.partition(".")
+    return str(file.with_name(f"{name}-{worker}{dot}{suffixes}"))
+
+
+class UpdateRecorder:
+    """
+    Appends the incoming updates to a JSON lines file, gzip-compressed when the path ends with ``.gz``.
+
+    Every line is ``{"time": <unix time>, "update": <update as sent by Telegram>}``.
+    Lines are compressed and written by a background thread, a full queue makes the caller wait.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        file = gzip.open(path, "at", encoding="utf-8") if path.endswith(".gz") else open(path, "a", encoding="utf-8")
+        self._sink = QueueSink(file, overflow_policy="block")
+
+    def record(self, update: Update) -> None:
+        line = orjson.dumps(
+            {"time": time.time(), "update": update.model_dump(mode="json", by_alias=True, exclude_none=True)},
+            option=orjson.OPT_APPEND_NEWLINE,
+        )
+        self._sink.write(line.decode())
+
+    async def middleware(
+        self,
+        handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        self.record(event)
+        return await handler(event, data)
+
+    async def close(self) -> None:
+        self._sink.stop()
+        self._sink.stream.close()
+        logger.info("Recorded {count:,} updates to {path}", count=self._sink.written, path=self.path)
+
+
+def read_recording(path: str) -> Iterator[tuple[float, dict[str, Any]]]:
+    """Yield ``(time, update)`` pairs of a recording, a recording cut by a crash is read up to the cut"""
+    with gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb") as file:
+        try:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    record = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    logger.warning("Skipping a broken line of {path}", path=path)
+                    continue
+                yield record["time"], record["update"]
+        except EOFError:
+            logger.warning("{path} ends abruptly, it was not closed properly", path=path)
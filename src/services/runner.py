@@ -0,0 +1,98 @@
+import multiprocessing
+import signal
+import time
+from types import FrameType
+from typing import Callable
+
+from loguru import logger
+
+Worker = Callable[[list[str], int], None]
+
+
+def shard_tokens(tokens: list[str], processes: int) -> list[list[str]]:
+    """Split the tokens between at most ``processes`` shards"""
+    processes = max(1, min(processes, len(tokens)))
+    return [tokens[i::processes] for i in range(processes)]
+
+
+def _run_worker(worker: Worker, tokens: list[str], index: int) -> None:
+    # the forked process inherits the handlers of the supervisor
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    worker(tokens, index)
+
+
+def supervise(
+    shards: list[list[str]],
+    worker: Worker,
+    restart_delay: float = 1.0,
+    max_restart_delay: float = 60.0,
+) -> None:
+    """
+    Run ``worker(tokens, index)`` in a separate process for every shard and restart the ones that crash.
+
+    Processes are forked, so they inherit the configured logger; add the sink with ``enqueue=True``
+    to get the records of all workers written by this process.
+    Restarts of a worker crashing right after the start are delayed exponentially up to ``max_restart_delay``.
+    SIGTERM and SIGINT stop the workers and wait for them to finish.
+    """
+    context = multiprocessing.get_context("fork")
+    processes: dict[int, multiprocessing.process.BaseProcess] = {}
+    started_at: dict[int, float] = {}
+    crashes = [0] * len(shards)
+    restart_at: dict[int, float] = {}
+    stopping = False
+
+    def start(index: int) -> None:
+        process = context.Process(target=_run_worker, args=(worker, shards[index], index), name=f"bot-worker-{index}")
+        process.start()
+        processes[index] = process
+        started_at[index] = time.monotonic()
+        logger.info(
+            "Started worker {index} (pid {pid}) for {bots} bots", index=index, pid=process.pid, bots=len(shards[index])
+        )
+
+    def stop(signum: int, frame: FrameType | None) -> None:
+        nonlocal stopping
+        stopping = True
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for index in range(len(shards)):
+        start(index)
+
+    while processes or (restart_at and not stopping):
+        for index, process in list(processes.items()):
+            if process.is_alive():
+                continue
+            del processes[index]
+
+            if stopping or process.exitcode == 0:
+                logger.info("Worker {index} stopped", index=index)
+                continue
+
+            # a worker that ran fine for a while is not crashing over and over
+            if time.monotonic() - started_at[index] > max_restart_delay:
+                crashes[index] = 0
+            crashes[index] += 1
+            delay = min(restart_delay * 2 ** (crashes[index] - 1), max_restart_delay)
+            restart_at[index] = time.monotonic() + delay
+            logger.error(
+                "Worker {index} exited with code {code}, restarting in {delay:.3g}s",
+                index=index,
+                code=process.exitcode,
+                delay=delay,
+            )
+
+        for index, at in list(restart_at.items()):
+            if stopping:
+                restart_at.clear()
+            elif time.monotonic() >= at:
+                del restart_at[index]
+                start(index)
+
+        time.sleep(0.5)
@@ -0,0 +1,99 @@
+import asyncio
+import time
+from typing import Hashable
+
+from loguru import logger
+
+SampleKey = tuple[str, Hashable]
+
+
+class UpdateLogSampler:
+    """
+    Decides which update log records are written.
+
+    - ``sample_rates`` keeps only every N-th update of the given event types
+    - ``rate`` and ``burst`` configure a token bucket per chat and event type, ``rate`` of ``0`` disables it
+
+    Suppressed updates are counted and reported every ``summary_interval`` seconds between ``start`` and ``stop``,
+    and once more by ``stop``.
+    """
+
+    def __init__(
+        self,
+        sample_rates: dict[str, int] | None = None,
+        rate: float = 0,
+        burst: float = 20,
+        summary_interval: float = 10,
+    ) -> None:
+        self.sample_rates = {event_type: n for event_type, n in (sample_rates or {}).items() if n > 1}
+        self.rate = rate
+        self.burst = burst
+        self.summary_interval = summary_interval
+
+        self._seen: dict[str, int] = {}
+        self._buckets: dict[SampleKey, tuple[float, float]] = {}
+        self._suppressed: dict[SampleKey, int] = {}
+        self._summarized_at = time.monotonic()
+        self._summarizer: asyncio.Task[None] | None = None
+
+    def allow(self, event_type: str, chat_id: Hashable) -> bool:
+        sample_rate = self.sample_rates.get(event_type)
+        if sample_rate is not None:
+            seen = self._seen[event_type] = self._seen.get(event_type, 0) + 1
+            if seen % sample_rate != 1:
+                return self._suppress(event_type, chat_id)
+
+        if self.rate > 0:
+            now = time.monotonic()
+            key = (event_type, chat_id)
+            tokens, last = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return self._suppress(event_type, chat_id)
+            self._buckets[key] = (tokens - 1, now)
+
+        return True
+
+    def _suppress(self, event_type: str, chat_id: Hashable) -> bool:
+        key = (event_type, chat_id)
+        self._suppressed[key] = self._suppressed.get(key, 0) + 1
+        return False
+
+    def summarize(self) -> None:
+        """Log the amount of suppressed updates since the last summary"""
+        now = time.monotonic()
+        interval = now - self._summarized_at
+        self._summarized_at = now
+
+        suppressed, self._suppressed = self._suppressed, {}
+        for (event_type, chat_id), count in suppressed.items():
+            logger.bind(update_type="SUPPRESSED").log(
+                "UPDATE",
+                "Suppressed {suppressed:,} {event_type} updates in chat {chat_id} in the last {interval:.3g}s",
+                suppressed=count,
+                event_type=event_type,
+                chat_id=chat_id,
+                interval=interval,
+            )
+
+        # buckets that are full again are the same as missing ones
+        refill_time = self.burst / self.rate if self.rate > 0 else 0
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if now - bucket[1] < refill_time}
+
+    async def _summarize_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.summary_interval)
+            self.summarize()
+
+    async def start(self) -> None:
+        if self._summarizer is None:
+            self._summarized_at = time.monotonic()
+            self._summarizer = asyncio.create_task(self._summarize_periodically())
+
+    async def stop(self) -> None:
+        if self._summarizer is not None:
+            self._summarizer.cancel()
+            await asyncio.gather(self._summarizer, return_exceptions=True)
+            self._summarizer = None
+        self.summarize()
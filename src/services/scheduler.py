@@ -0,0 +1,125 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Hashable
+
+from aiogram.dispatcher.middlewares.user_context import EVENT_CONTEXT_KEY, EventContext
+from aiogram.types import Update
+from loguru import logger
+
+from src.services.metrics import GaugeFamily, HistogramFamily, register_metric
+
+scheduler_wait = register_metric(
+    HistogramFamily("bot_scheduler_wait_seconds", "Time an update waited in the scheduler before processing", ())
+)
+scheduler_pending = register_metric(
+    GaugeFamily("bot_scheduler_pending_updates", "Updates accepted by the scheduler and not processed yet", ())
+)
+scheduler_chats = register_metric(
+    GaugeFamily("bot_scheduler_active_chats", "Chats with updates queued or in processing", ())
+)
+
+Job = Callable[[], Awaitable[Any]]
+
+
+class UpdateScheduler:
+    """
+    Runs updates with a global concurrency cap while keeping updates of the same chat in order.
+
+    Every chat with queued updates has one task processing them one by one, so the amount of tasks
+    is bounded by the amount of pending updates. When ``max_pending`` updates are accepted and not processed yet,
+    ``submit`` waits, which stops the poller (or webhook workers) from fetching more.
+    On shutdown ``close`` gives the accepted updates ``drain_timeout`` seconds to finish.
+    """
+
+    def __init__(self, concurrency: int = 256, max_pending: int = 4096, drain_timeout: float = 10) -> None:
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.drain_timeout = drain_timeout
+
+        self.pending = 0
+        self.running = 0
+
+        self._running = asyncio.Semaphore(concurrency)
+        self._pending = asyncio.Semaphore(max_pending)
+        self._chats: dict[Hashable, deque[tuple[float, Job]]] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def submit(self, key: Hashable | None, job: Job) -> None:
+        """Accept the job, waiting while the scheduler is full. Jobs with the same ``key`` run in submission order"""
+        await self._pending.acquire()
+        self.pending += 1
+        scheduler_pending.set((), self.pending)
+        self._idle.clear()
+
+        item = (time.perf_counter(), job)
+        if key is not None and key in self._chats:
+            self._chats[key].append(item)
+            return
+
+        queue = deque([item])
+        if key is not None:
+            self._chats[key] = queue
+            scheduler_chats.set((), len(self._chats))
+
+        task = asyncio.create_task(self._run_queue(key, queue))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_queue(self, key: Hashable | None, queue: deque[tuple[float, Job]]) -> None:
+        try:
+            while queue:
+                queued_at, job = queue.popleft()
+                async with self._running:
+                    scheduler_wait.observe((), time.perf_counter() - queued_at)
+                    self.running += 1
+                    try:
+                        await job()
+                    except Exception:
+                        logger.exception("Error while processing scheduled update")
+                    finally:
+                        self.running -= 1
+                        self.pending -= 1
+                        scheduler_pending.set((), self.pending)
+                        self._pending.release()
+                        if not self.pending:
+                            self._idle.set()
+        finally:
+            if key is not None:
+                del self._chats[key]
+                scheduler_chats.set((), len(self._chats))
+
+    async def close(self) -> None:
+        """Shutdown hook waiting for the accepted updates and cancelling the ones left after the timeout"""
+        if self.pending:
+            logger.info("Waiting for {pending} scheduled updates to finish", pending=self.pending)
+            try:
+                await asyncio.wait_for(self._idle.wait(), self.drain_timeout)
+            except TimeoutError:
+                logger.warning(
+                    "{pending} scheduled updates didn't finish in {timeout}s, cancelling them",
+                    pending=self.pending,
+                    timeout=self.drain_timeout,
+                )
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict[str, int]:
+        return {"pending": self.pending, "running": self.running, "active_chats": len(self._chats)}
+
+    async def middleware(
+        self,
+        handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> None:
+        """Outer update middleware that hands the rest of the processing over to the scheduler"""
+        event_context: EventContext | None = data.get(EVENT_CONTEXT_KEY)
+        key = None
+        if event_context is not None:
+            key = event_context.chat_id or event_context.user_id
+
+        await self.submit(key, lambda: handler(event, data))
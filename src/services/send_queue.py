@@ -0,0 +1,295 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterable,
+    Callable,
+    Hashable,
+    NamedTuple,
+    TypeVar,
+)
+
+from aiogram.methods import (
+    EditMessageCaption,
+    EditMessageMedia,
+    EditMessageReplyMarkup,
+    EditMessageText,
+    TelegramMethod,
+)
+from loguru import logger
+
+from src.types.settings import settings
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+T = TypeVar("T")
+ChatId = int | str
+
+HIGH = 0
+NORMAL = 1
+LOW = 2
+
+EDIT_METHODS = (EditMessageText, EditMessageCaption, EditMessageMedia, EditMessageReplyMarkup)
+
+
+class _Job:
+    __slots__ = ("method", "future", "chat_id", "edit_key")
+
+    def __init__(
+        self,
+        method: TelegramMethod[Any],
+        future: "asyncio.Future[Any]",
+        chat_id: ChatId | None,
+        edit_key: Hashable | None,
+    ) -> None:
+        self.method = method
+        self.future = future
+        self.chat_id = chat_id
+        self.edit_key = edit_key
+
+
+class BroadcastResult(NamedTuple):
+    sent: int
+    failed: int
+
+
+def _edit_key(method: TelegramMethod[Any]) -> Hashable | None:
+    if type(method) not in EDIT_METHODS:
+        return None
+    return type(method), method.chat_id, method.message_id, method.inline_message_id  # type: ignore[attr-defined]
+
+
+class SendQueue:
+    """
+    Sends Bot API requests of one bot within the Telegram rate limits.
+
+    - a global token bucket allows ``rate`` requests per second with bursts of the same size
+    - requests to the same chat are spaced by ``1 / chat_rate`` seconds, ``1 / group_rate`` for groups and channels
+    - ``HIGH`` requests go before ``NORMAL`` ones and those before ``LOW`` ones, e.g. broadcasts
+    - a queued edit of a message is replaced by a newer edit of the same message instead of sending both
+
+    ``submit`` waits while ``max_pending`` requests are queued, so producers can't outrun the limits.
+    """
+
+    def __init__(
+        self,
+        bot: "Bot",
+        rate: float = 30,
+        chat_rate: float = 1,
+        group_rate: float = 20 / 60,
+        max_pending: int = 10000,
+    ) -> None:
+        self.bot = bot
+        self.rate = rate
+        self.chat_interval = 1 / chat_rate
+        self.group_interval = 1 / group_rate
+
+        self.pending = 0
+
+        self._lanes: tuple[deque[_Job], ...] = (deque(), deque(), deque())
+        # jobs waiting for their chat, ordered by the time they may be sent at
+        self._delayed: list[tuple[float, int, _Job]] = []
+        self._order = itertools.count()
+        self._chat_next: dict[ChatId, float] = {}
+        self._prune_at = 1024
+        self._edits: dict[Hashable, _Job] = {}
+
+        self._tokens = rate
+        self._refilled_at = time.monotonic()
+
+        self._slots = asyncio.Semaphore(max_pending)
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._worker: asyncio.Task[None] | None = None
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def submit(self, method: TelegramMethod[T], priority: int = NORMAL) -> "asyncio.Future[T]":
+        """Queue the request, waiting while the queue is full, and return the future of its result"""
+        edit_key = _edit_key(method)
+        if edit_key is None or edit_key not in self._edits:
+            await self._slots.acquire()
+
+            if edit_key is None or edit_key not in self._edits:
+                chat_id = getattr(method, "chat_id", None)
+                job = _Job(method, asyncio.get_running_loop().create_future(), chat_id, edit_key)
+                if edit_key is not None:
+                    self._edits[edit_key] = job
+                self._lanes[priority].append(job)
+
+                self.pending += 1
+                self._idle.clear()
+                self._wakeup.set()
+                if self._worker is None:
+                    self._worker = asyncio.create_task(self._run())
+                return job.future
+
+            # the same message got an edit queued while this one waited for a slot
+            self._slots.release()
+
+        job = self._edits[edit_key]
+        job.method = method
+        return job.future
+
+    async def send(self, method: TelegramMethod[T], priority: int = NORMAL) -> T:
+        """Queue the request and wait for its result"""
+        return await (await self.submit(method, priority))
+
+    async def broadcast(
+        self,
+        chat_ids: AsyncIterable[ChatId],
+        make_method: Callable[[ChatId], TelegramMethod[Any]],
+        priority: int = LOW,
+    ) -> BroadcastResult:
+        """
+        Send ``make_method(chat_id)`` to every chat from ``chat_ids``.
+
+        Chats are read from the iterable only as fast as the queue accepts requests,
+        so they don't have to fit into memory.
+        """
+        sent = failed = in_flight = 0
+        read_all = False
+        done = asyncio.Event()
+
+        def on_done(future: "asyncio.Future[Any]") -> None:
+            nonlocal sent, failed, in_flight
+            in_flight -= 1
+            if future.cancelled() or future.exception() is not None:
+                failed += 1
+            else:
+                sent += 1
+            if read_all and not in_flight:
+                done.set()
+
+        async for chat_id in chat_ids:
+            future = await self.submit(make_method(chat_id), priority)
+            in_flight += 1
+            future.add_done_callback(on_done)
+
+        read_all = True
+        if in_flight:
+            await done.wait()
+
+        logger.info("Broadcast finished: {sent:,} sent, {failed:,} failed", sent=sent, failed=failed)
+        return BroadcastResult(sent, failed)
+
+    async def close(self, timeout: float | None = None) -> None:
+        """Wait up to ``timeout`` seconds for the queued requests to be sent, cancel the rest"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except TimeoutError:
+            logger.warning("Send queue closed with {pending} requests unsent", pending=self.pending)
+
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        for lane in self._lanes:
+            for job in lane:
+                job.future.cancel()
+            lane.clear()
+        for _, _, job in self._delayed:
+            job.future.cancel()
+        self._delayed.clear()
+        self._edits.clear()
+
+    async def _run(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                self._wakeup.clear()
+                timeout = self._delayed[0][0] - time.monotonic() if self._delayed else None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except TimeoutError:
+                    pass
+                continue
+
+            await self._take_token()
+            task = asyncio.create_task(self._execute(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _next_job(self) -> _Job | None:
+        now = time.monotonic()
+        if self._delayed and self._delayed[0][0] <= now:
+            return heapq.heappop(self._delayed)[2]
+
+        for lane in self._lanes:
+            while lane:
+                job = lane.popleft()
+                send_at = self._reserve(job.chat_id, now)
+                if send_at <= now:
+                    return job
+                heapq.heappush(self._delayed, (send_at, next(self._order), job))
+        return None
+
+    def _reserve(self, chat_id: ChatId | None, now: float) -> float:
+        """Return the time the next request to the chat may be sent at and book it"""
+        if chat_id is None:
+            return now
+
+        if len(self._chat_next) >= self._prune_at:
+            self._chat_next = {key: at for key, at in self._chat_next.items() if at > now}
+            self._prune_at = max(1024, len(self._chat_next) * 2)
+
+        group = isinstance(chat_id, str) or chat_id < 0
+        send_at = max(now, self._chat_next.get(chat_id, now))
+        self._chat_next[chat_id] = send_at + (self.group_interval if group else self.chat_interval)
+        return send_at
+
+    async def _take_token(self) -> None:
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.rate, self._tokens + (now - self._refilled_at) * self.rate)
+            self._refilled_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    async def _execute(self, job: _Job) -> None:
+        if job.edit_key is not None:
+            # already gone when ``close`` cleared the edits before this task started
+            self._edits.pop(job.edit_key, None)
+        self._slots.release()
+
+        try:
+            result = await self.bot(job.method)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self.pending -= 1
+            if not self.pending:
+                self._idle.set()
+
+
+_send_queues: dict[int, SendQueue] = {}
+
+
+def get_send_queue(bot: "Bot") -> SendQueue:
+    """Return the send queue of the bot, configured from settings"""
+    send_queue = _send_queues.get(bot.id)
+    if send_queue is None:
+        send_queue = _send_queues[bot.id] = SendQueue(
+            bot,
+            rate=settings.send_rate,
+            chat_rate=settings.send_chat_rate,
+            group_rate=settings.send_group_rate,
+            max_pending=settings.send_max_pending,
+        )
+    return send_queue
+
+
+async def close_send_queues() -> None:
+    for send_queue in _send_queues.values():
+        await send_queue.close(settings.send_drain_timeout)
+    _send_queues.clear()
@@ -0,0 +1,34 @@
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
+
+from src.services.middlewares.requests import flood_control_middleware
+from src.types.settings import settings
+
+
+def create_session() -> AiohttpSession:
+    """Create the HTTP session for Bot API requests with the pool and timeouts from settings"""
+    api = PRODUCTION
+    if settings.api_server_url:
+        api = TelegramAPIServer.from_base(settings.api_server_url, is_local=settings.api_server_local)
+
+    session_class: type[AiohttpSession] = AiohttpSession
+    if settings.fast_decode:
+        from src.services.decoding import FastDecodeSession
+
+        session_class = FastDecodeSession
+
+    session = session_class(api=api, limit=settings.http_limit, timeout=settings.http_timeout)
+    # AiohttpSession only takes the total limit, the rest goes straight to the TCPConnector
+    session._connector_init.update(
+        limit_per_host=settings.http_limit_per_host,
+        keepalive_timeout=settings.http_keepalive_timeout,
+        ttl_dns_cache=settings.http_dns_cache_ttl,
+    )
+
+    # the first middleware is the outermost, so every retry is measured on its own
+    session.middleware(flood_control_middleware)
+    if settings.metrics_enabled:
+        from src.services.middlewares.metrics import request_metrics_middleware
+
+        session.middleware(request_metrics_middleware)
+    return session
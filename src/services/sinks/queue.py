@@ -0,0 +1,103 @@
+import threading
+from collections import deque
+from typing import Literal, TextIO
+
+OverflowPolicy = Literal["drop_oldest", "sample", "block"]
+
+
+class QueueSink:
+    """
+    Stream-like loguru sink that hands formatted records to a background writer thread.
+
+    Records are written in batches once ``batch_size`` of them are queued or ``flush_interval`` seconds passed.
+    When the queue is full the ``overflow_policy`` decides what happens to a new record:
+
+    - ``drop_oldest`` - the oldest queued record is dropped
+    - ``sample`` - only every ``sample_rate``-th record is kept (dropping the oldest one), others are dropped
+    - ``block`` - the caller waits until the writer frees some space
+    """
+
+    def __init__(
+        self,
+        stream: TextIO,
+        max_size: int = 10000,
+        batch_size: int = 256,
+        flush_interval: float = 0.5,
+        overflow_policy: OverflowPolicy = "drop_oldest",
+        sample_rate: int = 10,
+    ) -> None:
+        self.stream = stream
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.sample_rate = max(sample_rate, 1)
+
+        self.written = 0
+        self.dropped = 0
+
+        self._queue: deque[str] = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._overflowed = 0
+        self._stopped = False
+
+        self._thread = threading.Thread(target=self._run, name="log-queue-sink", daemon=True)
+        self._thread.start()
+
+    def write(self, message: str) -> None:
+        with self._lock:
+            if self._stopped:
+                return
+
+            if len(self._queue) >= self.max_size:
+                match self.overflow_policy:
+                    case "block":
+                        while len(self._queue) >= self.max_size and not self._stopped:
+                            self._not_full.wait()
+                    case "sample":
+                        self._overflowed += 1
+                        if self._overflowed % self.sample_rate != 0:
+                            self.dropped += 1
+                            return
+                        self._queue.popleft()
+                        self.dropped += 1
+                    case _:
+                        self._queue.popleft()
+                        self.dropped += 1
+            else:
+                self._overflowed = 0
+
+            self._queue.append(message)
+            if len(self._queue) >= self.batch_size:
+                self._not_empty.notify()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stopped = True
+            self._not_empty.notify()
+            self._not_full.notify_all()
+        self._thread.join()
+
+        if self.dropped > 0:
+            self.stream.write(f"Log queue sink dropped {self.dropped} records\n")
+            self.stream.flush()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if len(self._queue) < self.batch_size and not self._stopped:
+                    self._not_empty.wait(self.flush_interval)
+
+                batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.batch_size))]
+                stopped = self._stopped and len(self._queue) == 0
+                self._not_full.notify_all()
+
+            if batch:
+                self.stream.write("".join(batch))
+                self.stream.flush()
+                self.written += len(batch)
+
+            if stopped:
+                return
@@ -0,0 +1,48 @@
+from abc import abstractmethod
+from typing import Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseStorage,
+    DefaultKeyBuilder,
+    StateType,
+    StorageKey,
+)
+
+# state and data of a key, they are read and written together
+Record = tuple[str | None, dict[str, Any]]
+
+# bot id is a part of the key, so several bots can share a storage
+key_builder = DefaultKeyBuilder(with_bot_id=True, with_business_connection_id=True, with_destiny=True)
+
+
+def state_name(state: StateType) -> str | None:
+    return state.state if isinstance(state, State) else state
+
+
+class DurableStorage(BaseStorage):
+    """Storage reading and writing whole records, writes are batched"""
+
+    @abstractmethod
+    async def get_record(self, key: StorageKey) -> Record:
+        pass
+
+    @abstractmethod
+    async def set_records(self, records: dict[StorageKey, Record]) -> None:
+        """Write the records at once, a record without state and data is deleted"""
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        _, data = await self.get_record(key)
+        await self.set_records({key: (state_name(state), data)})
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        state, _ = await self.get_record(key)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        state, _ = await self.get_record(key)
+        await self.set_records({key: (state, dict(data))})
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, data = await self.get_record(key)
+        return data
@@ -0,0 +1,179 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Mapping
+from weakref import WeakSet
+
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from loguru import logger
+
+from src.services.metrics import CounterFamily, GaugeFamily, register_metric
+from src.services.storage.base import DurableStorage, Record, state_name
+
+_caches: WeakSet["CachedStorage"] = WeakSet()
+
+
+class CachedStorage(BaseStorage):
+    """
+    FSM storage keeping up to ``max_size`` recently used records in process in front of a durable backend.
+
+    Changes are written to the backend in batches every ``flush_interval`` seconds or as soon as
+    ``batch_size`` records changed, so a crash loses at most the changes of the last interval.
+    The cache expects that only this process changes the records of its bots, which holds for sharded workers.
+    The hit rate is logged every ``stats_interval`` seconds, ``0`` disables it.
+    """
+
+    def __init__(
+        self,
+        backend: DurableStorage,
+        max_size: int = 10000,
+        flush_interval: float = 1,
+        batch_size: int = 256,
+        stats_interval: float = 60,
+    ) -> None:
+        self.backend = backend
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.stats_interval = stats_interval
+
+        self.hits = 0
+        self.misses = 0
+        self.dirty: dict[StorageKey, Record] = {}
+
+        self._records: OrderedDict[StorageKey, Record] = OrderedDict()
+        # records taken by a running flush, they are still newer than the backend ones
+        self._flushing: dict[StorageKey, Record] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_requested = asyncio.Event()
+        self._flusher: asyncio.Task[None] | None = None
+        self._stats_at = time.monotonic() + stats_interval
+        _caches.add(self)
+
+    async def get_record(self, key: StorageKey) -> Record:
+        record = self._records.get(key)
+        if record is not None:
+            self._records.move_to_end(key)
+            self.hits += 1
+            return record
+
+        # evicted from the cache before being written
+        record = self.dirty.get(key) or self._flushing.get(key)
+        if record is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            record = await self.backend.get_record(key)
+            # the record could be changed while it was read
+            if key in self._records:
+                return self._records[key]
+
+        self._store(key, record)
+        return record
+
+    def _store(self, key: StorageKey, record: Record) -> None:
+        self._records[key] = record
+        self._records.move_to_end(key)
+        if len(self._records) > self.max_size:
+            # changed records are kept in ``dirty`` until they are written
+            self._records.popitem(last=False)
+
+    def _write(self, key: StorageKey, record: Record) -> None:
+        self._store(key, record)
+        self.dirty[key] = record
+
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+        if len(self.dirty) >= self.batch_size:
+            self._flush_requested.set()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        _, data = await self.get_record(key)
+        self._write(key, (state_name(state), data))
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        state, _ = await self.get_record(key)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        state, _ = await self.get_record(key)
+        self._write(key, (state, dict(data)))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, data = await self.get_record(key)
+        return data.copy()
+
+    async def flush(self) -> None:
+        """Write the changed records to the backend"""
+        async with self._flush_lock:
+            if not self.dirty:
+                return
+
+            self._flushing, self.dirty = self.dirty, {}
+            try:
+                await self.backend.set_records(self._flushing)
+            except BaseException as e:
+                # changes made meanwhile are newer
+                self.dirty = self._flushing | self.dirty
+                if not isinstance(e, Exception):
+                    raise
+                logger.exception("Failed to write {count} FSM records, retrying later", count=len(self._flushing))
+            finally:
+                self._flushing = {}
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval)
+            except TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self.flush()
+
+            if self.stats_interval and time.monotonic() >= self._stats_at:
+                self._stats_at = time.monotonic() + self.stats_interval
+                self.log_stats()
+
+    def log_stats(self) -> None:
+        reads = self.hits + self.misses
+        logger.info(
+            "FSM cache hit rate {hit_rate:.1%} ({hits:,} hits, {misses:,} misses), {size:,} records cached",
+            hit_rate=self.hits / reads if reads else 0,
+            hits=self.hits,
+            misses=self.misses,
+            size=len(self._records),
+        )
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+        self.log_stats()
+        await self.backend.close()
+
+
+register_metric(
+    CounterFamily(
+        "bot_fsm_cache_hits_total",
+        "FSM records read from the in-process cache",
+        (),
+        collect=lambda: {(): sum(cache.hits for cache in _caches)},
+    )
+)
+register_metric(
+    CounterFamily(
+        "bot_fsm_cache_misses_total",
+        "FSM records read from the storage backend",
+        (),
+        collect=lambda: {(): sum(cache.misses for cache in _caches)},
+    )
+)
+register_metric(
+    GaugeFamily(
+        "bot_fsm_cache_dirty_records",
+        "FSM records changed and not written to the storage backend yet",
+        (),
+        collect=lambda: {(): sum(len(cache.dirty) for cache in _caches)},
+    )
+)
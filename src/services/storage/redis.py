@@ -0,0 +1,53 @@
+from typing import TYPE_CHECKING, Any
+
+import orjson
+from aiogram.fsm.storage.base import StorageKey
+
+from src.services.storage.base import DurableStorage, Record, key_builder
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+
+class RedisStorage(DurableStorage):
+    """
+    FSM storage in Redis or a compatible server, needs the ``redis`` extra.
+
+    Keys have the layout of the aiogram ``RedisStorage`` with the bot id, so the existing states are kept.
+    A record is read with one MGET and a batch of records is written in one pipeline.
+    """
+
+    def __init__(self, redis: "Redis", state_ttl: int | None = None, data_ttl: int | None = None) -> None:
+        self.redis = redis
+        self.state_ttl = state_ttl
+        self.data_ttl = data_ttl
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "RedisStorage":
+        from redis.asyncio import Redis
+
+        return cls(Redis.from_url(url), **kwargs)
+
+    async def get_record(self, key: StorageKey) -> Record:
+        state, data = await self.redis.mget(key_builder.build(key, "state"), key_builder.build(key, "data"))
+        if isinstance(state, bytes):
+            state = state.decode()
+        return state, orjson.loads(data) if data else {}
+
+    async def set_records(self, records: dict[StorageKey, Record]) -> None:
+        async with self.redis.pipeline(transaction=False) as pipeline:
+            for key, (state, data) in records.items():
+                state_key = key_builder.build(key, "state")
+                data_key = key_builder.build(key, "data")
+                if state is None:
+                    pipeline.delete(state_key)
+                else:
+                    pipeline.set(state_key, state, ex=self.state_ttl)
+                if data:
+                    pipeline.set(data_key, orjson.dumps(data), ex=self.data_ttl)
+                else:
+                    pipeline.delete(data_key)
+            await pipeline.execute()
+
+    async def close(self) -> None:
+        await self.redis.aclose(close_connection_pool=True)
@@ -0,0 +1,80 @@
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+import orjson
+from aiogram.fsm.storage.base import StorageKey
+
+from src.services.storage.base import DurableStorage, Record, key_builder
+
+T = TypeVar("T")
+
+SCHEMA = "CREATE TABLE IF NOT EXISTS fsm (key TEXT PRIMARY KEY, state TEXT, data BLOB) WITHOUT ROWID"
+UPSERT = (
+    "INSERT INTO fsm (key, state, data) VALUES (?, ?, ?) "
+    "ON CONFLICT (key) DO UPDATE SET state = excluded.state, data = excluded.data"
+)
+DELETE = "DELETE FROM fsm WHERE key = ?"
+
+
+class SQLiteStorage(DurableStorage):
+    """
+    FSM storage in a local SQLite database, works without any server.
+
+    Queries run one by one in a separate thread, the database is opened on the first query.
+    Worker processes can share the file, it's opened in the WAL mode.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._connection: sqlite3.Connection | None = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm-sqlite")
+
+    async def _run(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._call, func)
+
+    def _call(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            connection.execute("PRAGMA busy_timeout = 5000")
+            connection.execute(SCHEMA)
+            self._connection = connection
+        return func(self._connection)
+
+    async def get_record(self, key: StorageKey) -> Record:
+        def select(connection: sqlite3.Connection) -> tuple[str | None, bytes | None] | None:
+            return connection.execute("SELECT state, data FROM fsm WHERE key = ?", (key_builder.build(key),)).fetchone()
+
+        row = await self._run(select)
+        if row is None:
+            return None, {}
+        state, data = row
+        return state, orjson.loads(data) if data else {}
+
+    async def set_records(self, records: dict[StorageKey, Record]) -> None:
+        upserts: list[tuple[str, str | None, bytes]] = []
+        deletes: list[tuple[str]] = []
+        for key, (state, data) in records.items():
+            if state is None and not data:
+                deletes.append((key_builder.build(key),))
+            else:
+                upserts.append((key_builder.build(key), state, orjson.dumps(data)))
+
+        def write(connection: sqlite3.Connection) -> None:
+            with connection:
+                connection.executemany(UPSERT, upserts)
+                connection.executemany(DELETE, deletes)
+
+        await self._run(write)
+
+    async def close(self) -> None:
+        def close(connection: sqlite3.Connection) -> Any:
+            connection.close()
+
+        if self._connection is not None:
+            await self._run(close)
+            self._connection = None
+        self._executor.shutdown()
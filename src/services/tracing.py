@@ -0,0 +1,232 @@
+import asyncio
+import io
+import sys
+import threading
+import time
+import traceback
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+from aiogram.types import TelegramObject, Update
+from loguru import logger
+
+from src.services.metrics import GaugeFamily, register_metric
+
+if TYPE_CHECKING:
+    from loguru import Record
+
+loop_lag = register_metric(GaugeFamily("bot_event_loop_lag_seconds", "Last measured lag of the event loop", ()))
+updates_in_flight = register_metric(GaugeFamily("bot_updates_in_flight", "Updates being processed right now", ()))
+
+
+class Trace:
+    """Trace id of an update and the time of every stage of its processing since it was received"""
+
+    __slots__ = ("trace_id", "event_type", "started", "stages", "task", "reported")
+
+    def __init__(self, trace_id: str, event_type: str, task: asyncio.Task[Any] | None) -> None:
+        self.trace_id = trace_id
+        self.event_type = event_type
+        self.started = time.perf_counter()
+        self.stages: list[tuple[str, float]] = []
+        self.task = task
+        self.reported = False
+
+    def mark(self, stage: str) -> None:
+        self.stages.append((stage, time.perf_counter() - self.started))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def timings(self) -> str:
+        return ", ".join(f"{stage} +{offset * 1000:.1f}ms" for stage, offset in self.stages)
+
+
+trace_context: ContextVar[Trace | None] = ContextVar("trace_context", default=None)
+
+
+def current_trace_id() -> str | None:
+    trace = trace_context.get()
+    return trace.trace_id if trace is not None else None
+
+
+def trace_patcher(record: "Record") -> None:
+    """Loguru patcher adding the trace id of the current update to every record emitted while processing it"""
+    trace = trace_context.get()
+    if trace is not None:
+        record["extra"].setdefault("trace_id", trace.trace_id)
+
+
+def _task_stack(task: asyncio.Task[Any] | None) -> str:
+    if task is None:
+        return "unknown task"
+    stack = io.StringIO()
+    task.print_stack(file=stack)
+    return stack.getvalue().rstrip()
+
+
+class UpdateTracer:
+    """
+    Gives every update a trace id (``<bot id>:<update id>``) kept in a context variable for the time of its processing,
+    so records logged by handlers and the tasks they start carry it, and marks when every stage of the processing starts.
+
+    - updates running longer than ``slow_budget`` seconds are reported once with their stages and current stack,
+      checked every ``check_interval`` seconds
+    - the event loop lag is measured every ``lag_interval`` seconds and reported above ``lag_threshold`` seconds,
+      a loop blocked for longer is reported from a thread with the stack it's stuck in, ``0`` disables the monitor
+    """
+
+    def __init__(
+        self,
+        slow_budget: float = 5,
+        check_interval: float = 1,
+        lag_threshold: float = 0.1,
+        lag_interval: float = 0.5,
+    ) -> None:
+        self.slow_budget = slow_budget
+        self.check_interval = check_interval
+        self.lag_threshold = lag_threshold
+        self.lag_interval = lag_interval
+
+        self.in_flight: dict[str, Trace] = {}
+
+        self._tasks: list[asyncio.Task[None]] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._heartbeat = time.monotonic()
+        self._stopped = threading.Event()
+        self._stall_thread: threading.Thread | None = None
+
+    async def middleware(
+        self,
+        handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        """Outer update middleware starting the trace"""
+        trace = Trace(f"{data['bot'].id}:{event.update_id}", event.event_type, asyncio.current_task())
+        trace.mark("received")
+        token = trace_context.set(trace)
+        self.in_flight[trace.trace_id] = trace
+        updates_in_flight.set((), len(self.in_flight))
+        try:
+            return await handler(event, data)
+        finally:
+            trace.mark("done")
+            del self.in_flight[trace.trace_id]
+            updates_in_flight.set((), len(self.in_flight))
+            trace_context.reset(token)
+            if trace.reported:
+                logger.bind(trace_id=trace.trace_id).warning(
+                    "Slow update {trace_id} ({event_type}) finished in {elapsed:.3f}s: {timings}",
+                    trace_id=trace.trace_id,
+                    event_type=trace.event_type,
+                    elapsed=trace.elapsed(),
+                    timings=trace.timings(),
+                )
+
+    async def update_middleware(
+        self,
+        handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        """Last inner update middleware marking the end of the middlewares and the start of the routing"""
+        trace = trace_context.get()
+        if trace is not None:
+            trace.mark("routing")
+        return await handler(event, data)
+
+    async def handler_middleware(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        """Inner middleware of the event observers marking the start and the end of the handler"""
+        trace = trace_context.get()
+        if trace is None:
+            return await handler(event, data)
+
+        callback = data["handler"].callback
+        name = getattr(callback, "__qualname__", repr(callback))
+        trace.mark(f"handler {name}")
+        try:
+            return await handler(event, data)
+        finally:
+            trace.mark(f"handler {name} done")
+
+    def check(self) -> None:
+        """Report the updates running longer than the budget for the first time"""
+        for trace in list(self.in_flight.values()):
+            if trace.reported or trace.elapsed() < self.slow_budget:
+                continue
+            trace.reported = True
+            logger.bind(trace_id=trace.trace_id).warning(
+                "Update {trace_id} ({event_type}) is running for {elapsed:.3f}s: {timings}\n{stack}",
+                trace_id=trace.trace_id,
+                event_type=trace.event_type,
+                elapsed=trace.elapsed(),
+                timings=trace.timings(),
+                stack=_task_stack(trace.task),
+            )
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            self.check()
+
+    async def _measure_lag(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.lag_interval)
+            self._heartbeat = time.monotonic()
+            lag = self._heartbeat - started - self.lag_interval
+            loop_lag.set((), lag)
+            if lag > self.lag_threshold:
+                logger.warning("Event loop lagged by {lag:.3f}s", lag=lag)
+
+    def _watch_stalls(self) -> None:
+        reported_heartbeat = None
+        while not self._stopped.wait(self.lag_interval):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat - self.lag_interval
+            if stalled <= self.lag_threshold or heartbeat == reported_heartbeat:
+                continue
+            reported_heartbeat = heartbeat
+
+            frame = sys._current_frames().get(self._loop_thread_id)  # type: ignore[arg-type]
+            stack = "".join(traceback.format_stack(frame)).rstrip() if frame is not None else "unknown stack"
+            # asyncio keeps the running task of every loop in a dict that is safe to read from here
+            task = asyncio.current_task(self._loop)
+            trace = next((t for t in list(self.in_flight.values()) if task is not None and t.task is task), None)
+            logger.warning(
+                "Event loop is blocked for {stalled:.3f}s in update {trace_id}:\n{stack}",
+                stalled=stalled,
+                trace_id=trace.trace_id if trace is not None else "-",
+                stack=stack,
+            )
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+
+        self._tasks.append(asyncio.create_task(self._watch()))
+        if self.lag_threshold > 0:
+            self._tasks.append(asyncio.create_task(self._measure_lag()))
+            self._stall_thread = threading.Thread(target=self._watch_stalls, name="loop-stall-watchdog", daemon=True)
+            self._stall_thread.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self._stall_thread is not None:
+            self._stall_thread.join()
+            self._stall_thread = None
@@ -0,0 +1,101 @@
+import asyncio
+from typing import Any
+
+from aiogram import Bot as AiogramBot
+from aiogram import Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+from loguru import logger
+
+from src.types.settings import settings
+
+
+class WebhookRequestHandler(SimpleRequestHandler):
+    """
+    Webhook handler that acknowledges updates right away and processes them with a fixed pool of workers.
+
+    Updates wait in a bounded queue, so when the workers can't keep up the responses to Telegram
+    are delayed instead of piling up an unbounded amount of tasks.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: AiogramBot,
+        secret_token: str | None = None,
+        workers: int = 64,
+        queue_size: int = 1024,
+        drain_timeout: float = 10,
+        **data: Any,
+    ) -> None:
+        super().__init__(dispatcher, bot, handle_in_background=True, secret_token=secret_token, **data)
+        self.workers = workers
+        self.drain_timeout = drain_timeout
+        self._queue: asyncio.Queue[tuple[AiogramBot, dict[str, Any]]] = asyncio.Queue(maxsize=queue_size)
+        self._worker_tasks: list[asyncio.Task[None]] = []
+
+    def register(self, app: web.Application, /, path: str, **kwargs: Any) -> None:
+        app.on_startup.append(self._start_workers)  # type: ignore[arg-type]
+        super().register(app, path=path, **kwargs)
+
+    async def _start_workers(self, app: web.Application) -> None:
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(), name=f"webhook-worker-{i}") for i in range(self.workers)
+        ]
+
+    async def _worker(self) -> None:
+        while True:
+            bot, update = await self._queue.get()
+            try:
+                await self._background_feed_update(bot=bot, update=update)
+            except Exception:
+                logger.exception("Error while processing webhook update")
+            finally:
+                self._queue.task_done()
+
+    async def _handle_request_background(self, bot: AiogramBot, request: web.Request) -> web.Response:
+        await self._queue.put((bot, await request.json(loads=bot.session.json_loads)))
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def close(self) -> None:
+        try:
+            await asyncio.wait_for(self._queue.join(), self.drain_timeout)
+        except TimeoutError:
+            logger.warning(
+                "Webhook updates didn't finish in {timeout}s, cancelling the workers with {queued} updates queued",
+                timeout=self.drain_timeout,
+                queued=self._queue.qsize(),
+            )
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        # the session is closed by the last shutdown hook of the dispatcher, the scheduled updates still use it
+
+
+def run_webhook(dispatcher: Dispatcher, bot: AiogramBot, allowed_updates: list[str]) -> None:
+    async def set_webhook(bot: AiogramBot) -> None:
+        await bot.set_webhook(
+            url=f"{settings.webhook_url.rstrip('/')}{settings.webhook_path}",
+            secret_token=settings.webhook_secret,
+            max_connections=settings.webhook_max_connections,
+            allowed_updates=allowed_updates,
+        )
+
+    async def close_session(bot: AiogramBot) -> None:
+        await bot.session.close()
+
+    dispatcher.startup.register(set_webhook)
+    dispatcher.shutdown.register(close_session)
+
+    app = web.Application(client_max_size=settings.webhook_max_body_size)
+    WebhookRequestHandler(
+        dispatcher,
+        bot,
+        secret_token=settings.webhook_secret,
+        workers=settings.webhook_workers,
+        queue_size=settings.webhook_queue_size,
+        drain_timeout=settings.shutdown_drain_timeout,
+    ).register(app, path=settings.webhook_path)
+    setup_application(app, dispatcher, bot=bot)
+
+    web.run_app(app, host=settings.webhook_host, port=settings.webhook_port, print=None)
@@ -1,3 +1,6 @@
+from typing import Literal
+
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -5,7 +8,112 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         extra="ignore",
     )
-    bot_token: str
+    bot_token: str = ""
+    # to run several bots, e.g. ["123:abc", "456:def"]
+    bot_tokens: list[str] = []
+    # worker processes to shard the bots between, 1 runs all of them in this process
+    bot_processes: int = 1
+
+    log_level: str = "DEBUG"
+    log_updates: bool = True
+    # e.g. {"message_reaction_count": 100} to log only every 100th update of this type
+    log_sample_rates: dict[str, int] = {}
+    # updates per second logged for every chat and event type, 0 disables the limit
+    log_rate_limit: float = 0
+    log_rate_burst: float = 20
+    log_summary_interval: float = 10
+    log_mode: Literal["console", "json"] = "console"
+    entity_cache_size: int = 1024
+    # user texts longer than this are cut in the update log lines, 0 keeps them whole
+    log_text_limit: int = 512
+    log_sink: Literal["sync", "queue"] = "sync"
+    log_queue_size: int = 10000
+    log_queue_batch_size: int = 256
+    log_queue_flush_interval: float = 0.5
+    log_queue_overflow_policy: Literal["drop_oldest", "sample", "block"] = "drop_oldest"
+    log_queue_sample_rate: int = 10
+
+    # update types to receive, by default only the ones with registered handlers
+    allowed_updates: list[str] | None = None
+
+    run_mode: Literal["polling", "webhook"] = "polling"
+    webhook_url: str = ""
+    webhook_path: str = "/webhook"
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    webhook_secret: str | None = None
+    webhook_max_connections: int = 40
+    webhook_max_body_size: int = 1024**2
+    webhook_workers: int = 64
+    webhook_queue_size: int = 1024
+
+    scheduler_enabled: bool = False
+    scheduler_concurrency: int = 256
+    scheduler_max_pending: int = 4096
+
+    metrics_enabled: bool = False
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 9100
+
+    # trace ids of updates in the logs and warnings with the stack of updates running longer than slow_update_budget
+    tracing_enabled: bool = False
+    slow_update_budget: float = 5
+    slow_update_check_interval: float = 1
+    # event loop lag reported above this many seconds, 0 disables the monitor
+    loop_lag_threshold: float = 0.1
+    loop_lag_interval: float = 0.5
+
+    # JSON file keeping the polling offsets and the bot users over restarts, e.g. "data/state.json"
+    state_file: str = ""
+    state_save_interval: float = 5
+    # seconds to wait on shutdown for the updates being processed in both run modes,
+    # keep it below the stop timeout of the container
+    shutdown_drain_timeout: float = 10
+
+    # path to append the incoming updates to for replaying, e.g. "updates.jsonl.gz"
+    record_updates: str = ""
+
+    # "sqlite" and "redis" keep the states over restarts, FSM_STORAGE_URL is a file path or a redis:// url
+    fsm_storage: Literal["memory", "sqlite", "redis"] = "memory"
+    fsm_storage_url: str = ""
+    fsm_cache_size: int = 10000
+    fsm_flush_interval: float = 1
+    fsm_flush_batch_size: int = 256
+    fsm_stats_interval: float = 60
+
+    # base url of a local Bot API server, e.g. "http://localhost:8081"
+    api_server_url: str = ""
+    api_server_local: bool = False
+    http_limit: int = 100
+    # 0 is no limit per host
+    http_limit_per_host: int = 0
+    http_keepalive_timeout: float = 15
+    http_dns_cache_ttl: int = 3600
+    http_timeout: float = 60
+    # decode responses with orjson and validate polled updates one by one
+    fast_decode: bool = False
+    # retries of requests hitting the flood control, waiting retry_after seconds up to api_retry_max_delay
+    api_retry_attempts: int = 3
+    api_retry_max_delay: float = 60
+
+    # limits of the send queue, Telegram allows about 30 messages per second, 1 per second in a chat, 20 per minute in a group
+    send_rate: float = 30
+    send_chat_rate: float = 1
+    send_group_rate: float = 20 / 60
+    send_max_pending: int = 10000
+    send_drain_timeout: float = 10
+
+    @model_validator(mode="after")
+    def check_tokens(self) -> "Settings":
+        if not self.tokens:
+            raise ValueError("BOT_TOKEN or BOT_TOKENS is required")
+        return self
+
+    @property
+    def tokens(self) -> list[str]:
+        if self.bot_tokens:
+            return self.bot_tokens
+        return [self.bot_token] if self.bot_token else []
 
 
 settings = Settings()  # type: ignore[call-arg]